@@ -0,0 +1,48 @@
+import os
+import tempfile
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+@contextmanager
+def file_lock(path: str):
+    """Hold an exclusive lock on path, shared with other processes using the same file."""
+    with open(path, 'a+b') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def temp_file(path: str):
+    """
+    Open a uniquely named file beside path for writing, to be renamed over it once complete.
+    Processes writing the same cache entry at once each get their own file.
+    """
+    directory, name = os.path.split(path)
+    return tempfile.NamedTemporaryFile('wb', dir=directory or ".", prefix=f"{name}.", suffix=".tmp", delete=False)
+
+def write_atomic(path: str, data: bytes):
+    """Write data to path so readers see either the old file or the complete new one."""
+    tmp_file = temp_file(path)
+    try:
+        with tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_file.name, path)
+    except BaseException:
+        try:
+            os.remove(tmp_file.name)
+        except FileNotFoundError:
+            pass
+        raise
\ No newline at end of file
@@ -1,6 +1,5 @@
 import os
 import openai
-import requests
 import logging
 from dotenv import load_dotenv
 from reportlab.lib.pagesizes import letter
@@ -11,6 +10,8 @@ from reportlab.lib.units import inch
 import asyncio
 from PyPDF2 import PdfReader
 import re
+import image_library
+import keyword_extraction
 
 # Load environment variables
 load_dotenv()
@@ -66,8 +67,14 @@ def load_templates_and_ads(template_dir: str) -> dict:
 
 def extract_keywords(club_info: dict) -> list:
     """
-    Use GPT to extract relevant keywords from the club info for image search.
+    Extract relevant keywords from the club info for image search. A local extractor is
+    used when it is confident enough; otherwise GPT extracts them.
     """
+    local_keywords, confidence = keyword_extraction.extract_local_keywords(club_info)
+    if confidence >= keyword_extraction.MIN_CONFIDENCE or not keyword_extraction.LLM_FALLBACK:
+        logging.info(f"Using locally extracted keywords (confidence {confidence:.2f})")
+        return local_keywords
+
     prompt = f"""
     Analyze the following club information and extract 5-10 keywords that describe the club visually:
     Name: {club_info.get('name', 'N/A')}
@@ -90,33 +97,18 @@ def extract_keywords(club_info: dict) -> list:
         return keywords
     except Exception as e:
         logging.error(f"Error extracting keywords: {e}")
-        return []
+        return local_keywords
 
-def search_unsplash(keywords: list, output_folder: str) -> str:
+def search_unsplash(keywords: list, output_folder: str, color_scheme: str = None) -> str:
     """
-    Search Unsplash for images based on keywords and save the first image to the output folder.
+    Search Unsplash for images based on keywords and return a locally stored image.
+    Local library images, and keywords and photos seen before, are served without any network access.
     """
-    base_url = "https://api.unsplash.com/search/photos"
-    headers = {"Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"}
-
     os.makedirs(output_folder, exist_ok=True)
     selected_image = None
 
     try:
-        for keyword in keywords:
-            params = {"query": keyword, "per_page": 1}
-            response = requests.get(base_url, headers=headers, params=params)
-            if response.status_code == 200:
-                results = response.json()["results"]
-                if results:
-                    image_url = results[0]["urls"]["regular"]
-                    image_data = requests.get(image_url).content
-                    selected_image = os.path.join(output_folder, f"{keyword}.jpg")
-                    with open(selected_image, 'wb') as img_file:
-                        img_file.write(image_data)
-                    break
-            else:
-                logging.error(f"Unsplash API error for keyword '{keyword}': {response.status_code}")
+        selected_image = image_library.find_image(keywords, output_folder, color_scheme)
     except Exception as e:
         logging.error(f"Error searching Unsplash: {e}")
 
@@ -200,7 +192,7 @@ async def main():
     # Extract keywords and search Unsplash for images
     logging.info("Extracting keywords and searching for images...")
     keywords = extract_keywords(club_info)
-    selected_image = search_unsplash(keywords, image_folder)
+    selected_image = search_unsplash(keywords, image_folder, club_info.get("color scheme"))
 
     # Generate PDF from the club information and the selected image
     logging.info("Creating PDF with ReportLab...")
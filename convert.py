@@ -1,6 +1,7 @@
 import os
+import sys
+import json
 import openai
-import requests
 import logging
 from dotenv import load_dotenv
 from reportlab.lib.pagesizes import letter
@@ -10,7 +11,7 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 import asyncio
 from PyPDF2 import PdfReader
-from weasyprint import HTML
+import render
 
 # Load environment variables
 load_dotenv()
@@ -26,9 +27,24 @@ logging.basicConfig(
 )
 
 async def main():
+    # Output formats from the command line, e.g. `python convert.py pdf png json`
+    formats = sys.argv[1:] or ["pdf"]
     with open("out0.html", "r") as f:
         html_content = f.read()
-        HTML(string=html_content).write_pdf('out0.pdf', optimize_images=True, presentational_hints=True, )
+    if formats == ["pdf"]:
+        render.write_pdf(html_content, 'out0.pdf', optimize_images=True, presentational_hints=True)
+        return
+
+    # Lay out once and serialize the same document to every requested format
+    outputs = render.render_outputs(html_content, tuple(formats), optimize_images=True, presentational_hints=True)
+    for fmt, output in outputs.items():
+        if fmt == "json":
+            with open("out0.json", "w") as json_file:
+                json.dump(output, json_file, indent=2)
+        else:
+            with open(f"out0.{fmt}", "wb") as output_file:
+                output_file.write(output)
+        logging.info(f"Wrote out0.{fmt}")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,143 @@
+import os
+import re
+import sys
+import json
+import logging
+import threading
+from urllib.parse import urlparse, unquote
+import numpy as np
+
+TELEMETRY_FILE = os.path.join("cache", "render_telemetry.jsonl")
+MODEL_FILE = os.path.join("cache", "render_cost_model.json")
+MIN_SAMPLES = 10
+
+FEATURES = ["node_count", "image_mb", "remote_images", "gradients", "shadows", "font_families", "html_kb"]
+
+TAG_PATTERN = re.compile(r"<[a-zA-Z][^>]*>")
+IMAGE_SRC_PATTERN = re.compile(r"""(?:<img\b[^>]*\bsrc\s*=\s*["']|url\(\s*["']?)([^"')\s>]+)""", re.IGNORECASE)
+GRADIENT_PATTERN = re.compile(r"gradient\s*\(", re.IGNORECASE)
+SHADOW_PATTERN = re.compile(r"(?:box|text)-shadow\s*:", re.IGNORECASE)
+FONT_FAMILY_PATTERN = re.compile(r"font-family\s*:\s*([^;}\"]+|\"[^\"]*\"[^;}]*)", re.IGNORECASE)
+
+# Used until enough telemetry has been collected to fit a model: seconds and MB per feature
+DEFAULT_COEFFICIENTS = {
+    "seconds": [0.5, 0.002, 0.15, 0.5, 0.05, 0.02, 0.1, 0.001],
+    "memory_mb": [120.0, 0.05, 4.0, 10.0, 0.5, 0.2, 5.0, 0.01],
+}
+
+def _local_image_bytes(src: str, base_dir: str) -> int:
+    if src.startswith("file://"):
+        path = unquote(urlparse(src).path)
+    elif "://" in src or src.startswith("data:"):
+        return 0
+    else:
+        path = os.path.join(base_dir, src)
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def html_features(html: str, base_dir: str = ".") -> dict:
+    """Cheap features of a generated poster that drive its render time and memory."""
+    sources = IMAGE_SRC_PATTERN.findall(html)
+    families = set()
+    for match in FONT_FAMILY_PATTERN.findall(html):
+        families.update(name.strip().strip("'\"").lower() for name in match.split(","))
+    return {
+        "node_count": len(TAG_PATTERN.findall(html)),
+        "image_mb": sum(_local_image_bytes(src, base_dir) for src in sources) / (1024 * 1024),
+        "remote_images": sum(1 for src in sources if src.startswith(("http://", "https://"))),
+        "gradients": len(GRADIENT_PATTERN.findall(html)),
+        "shadows": len(SHADOW_PATTERN.findall(html)),
+        "font_families": len(families - {""}),
+        "html_kb": len(html) / 1024,
+    }
+
+def _vector(features: dict) -> np.ndarray:
+    return np.array([1.0] + [float(features.get(name, 0)) for name in FEATURES])
+
+class CostModel:
+    """
+    Linear model of render seconds and peak memory (MB) over html_features, fitted by
+    least squares on render telemetry. Falls back to DEFAULT_COEFFICIENTS until there are
+    MIN_SAMPLES successful renders to learn from.
+    """
+
+    def __init__(self, coefficients: dict = None):
+        self.coefficients = {target: np.array(values) for target, values in
+                             (coefficients or DEFAULT_COEFFICIENTS).items()}
+
+    def predict(self, features: dict) -> dict:
+        x = _vector(features)
+        return {target: max(0.0, float(x @ weights)) for target, weights in self.coefficients.items()}
+
+    @classmethod
+    def train(cls, telemetry_file: str = TELEMETRY_FILE) -> "CostModel":
+        samples = []
+        try:
+            with open(telemetry_file, 'r', encoding='utf-8') as telemetry:
+                for line in telemetry:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("status") == "ok":
+                        samples.append(record)
+        except FileNotFoundError:
+            pass
+        if len(samples) < MIN_SAMPLES:
+            logging.info(f"Only {len(samples)} render samples; using default cost coefficients.")
+            return cls()
+
+        X = np.stack([_vector(sample["features"]) for sample in samples])
+        coefficients = {}
+        for target in DEFAULT_COEFFICIENTS:
+            y = np.array([float(sample.get(target) or 0) for sample in samples])
+            coefficients[target] = np.linalg.lstsq(X, y, rcond=None)[0].tolist()
+        logging.info(f"Trained render cost model on {len(samples)} renders")
+        return cls(coefficients)
+
+    def save(self, model_file: str = MODEL_FILE):
+        os.makedirs(os.path.dirname(model_file), exist_ok=True)
+        with open(model_file, 'w', encoding='utf-8') as f:
+            json.dump({target: weights.tolist() for target, weights in self.coefficients.items()}, f, indent=2)
+
+    @classmethod
+    def load(cls, model_file: str = MODEL_FILE) -> "CostModel":
+        try:
+            with open(model_file, 'r', encoding='utf-8') as f:
+                return cls(json.load(f))
+        except (FileNotFoundError, ValueError):
+            return cls()
+
+_telemetry_lock = threading.Lock()
+
+def record(features: dict, status: str, seconds: float, memory_mb: float, worker_class: str,
+           telemetry_file: str = TELEMETRY_FILE):
+    """Append one render's features and measured cost to the telemetry log."""
+    line = json.dumps({"features": features, "status": status, "seconds": round(seconds, 3),
+                       "memory_mb": round(memory_mb, 1), "worker_class": worker_class})
+    try:
+        with _telemetry_lock:
+            os.makedirs(os.path.dirname(telemetry_file), exist_ok=True)
+            with open(telemetry_file, 'a', encoding='utf-8') as telemetry:
+                telemetry.write(line + "\n")
+    except OSError as e:
+        logging.error(f"Error recording render telemetry: {e}")
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model() -> CostModel:
+    """Return the saved cost model (see `python cost_model.py`), loading it once."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = CostModel.load()
+    return _model
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    model = CostModel.train(sys.argv[1] if len(sys.argv) > 1 else TELEMETRY_FILE)
+    model.save()
+    logging.info(f"Saved render cost model to {MODEL_FILE}")
\ No newline at end of file
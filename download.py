@@ -0,0 +1,66 @@
+import os
+import time
+import logging
+import unsplash
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_BYTES = 25 * 1024 * 1024
+
+def download_to_file(url: str, dest: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, timeout: float = 30) -> dict:
+    """
+    Stream a URL to dest in chunks without holding the body in memory.
+
+    Data is written to dest + ".part" and renamed into place only once complete. A
+    leftover .part file from an interrupted download is resumed with a Range request.
+    Raises ValueError if the body exceeds max_bytes. Returns throughput stats.
+    """
+    part_path = dest + ".part"
+    resume_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={resume_from}-"} if resume_from else {}
+
+    start = time.perf_counter()
+    with unsplash.get_session().get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 416:
+            # The server has nothing past what we already have
+            response.close()
+            os.replace(part_path, dest)
+            return {"url": url, "bytes": 0, "total_bytes": resume_from, "resumed_from": resume_from,
+                    "seconds": 0.0, "bytes_per_second": 0.0}
+        response.raise_for_status()
+
+        if response.status_code != 206:
+            resume_from = 0
+        content_length = response.headers.get("Content-Length")
+        if content_length and resume_from + int(content_length) > max_bytes:
+            # Don't leave an oversized download behind for the next attempt to resume
+            try:
+                os.remove(part_path)
+            except FileNotFoundError:
+                pass
+            raise ValueError(f"Download of {url} is {resume_from + int(content_length)} bytes, over the {max_bytes} byte limit.")
+
+        written = 0
+        try:
+            with open(part_path, 'ab' if resume_from else 'wb') as part_file:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    written += len(chunk)
+                    if resume_from + written > max_bytes:
+                        raise ValueError(f"Download of {url} exceeded the {max_bytes} byte limit.")
+                    part_file.write(chunk)
+        except ValueError:
+            os.remove(part_path)
+            raise
+
+    os.replace(part_path, dest)
+    seconds = time.perf_counter() - start
+    stats = {
+        "url": url,
+        "bytes": written,
+        "total_bytes": resume_from + written,
+        "resumed_from": resume_from,
+        "seconds": seconds,
+        "bytes_per_second": written / seconds if seconds > 0 else 0.0,
+    }
+    logging.info(f"Downloaded {written} bytes in {seconds:.2f}s ({stats['bytes_per_second'] / 1024:.0f} KiB/s): {url}")
+    return stats
\ No newline at end of file
@@ -0,0 +1,84 @@
+import logging
+from weasyprint import CSS
+import render
+import stylesheets
+import structure
+import simplify
+
+LETTER_SIZE = (8.5, 11)  # inches
+CSS_PX_PER_INCH = 96
+MIN_SCALE = 0.5
+MAX_PASSES = 6
+TOLERANCE = 0.5  # CSS px
+
+# Boxes whose clipping a reader would notice; decorative blocks may bleed off the page on purpose
+CONTENT_BOXES = ("LineBox", "InlineReplacedBox", "BlockReplacedBox")
+
+def page_size_css(scale: float, page_size: tuple = LETTER_SIZE) -> str:
+    """A page enlarged by 1/scale; writing it with zoom=scale brings it back to page_size."""
+    width, height = (dimension / scale for dimension in page_size)
+    return f"@page {{ size: {width:.4f}in {height:.4f}in !important; }}"
+
+def content_extent(page) -> tuple:
+    """Rightmost and bottommost edge (CSS px) of the text and images laid out on a page."""
+    right = bottom = 0
+    for box in structure.walk(page._page_box):
+        if type(box).__name__ not in CONTENT_BOXES:
+            continue
+        right = max(right, box.position_x + box.margin_width())
+        bottom = max(bottom, box.position_y + box.margin_height())
+    return right, bottom
+
+def fits(document) -> bool:
+    """True when a laid-out document is a single page with no content beyond its edges."""
+    if len(document.pages) != 1:
+        return False
+    page = document.pages[0]
+    right, bottom = content_extent(page)
+    return right <= page.width + TOLERANCE and bottom <= page.height + TOLERANCE
+
+def layout(html: str, scale: float, css: list = None, base_url: str = None, **options):
+    """Lay out prepared HTML on a letter page enlarged by 1/scale."""
+    sheets = [stylesheets.get_stylesheet(sheet) for sheet in css or []]
+    sheets.append(CSS(string=page_size_css(scale), font_config=stylesheets.get_font_config()))
+    return render.make_html(html, base_url, prepared=True).render(
+        stylesheets=sheets, font_config=stylesheets.get_font_config(), **options)
+
+def fit_to_page(html: str, css: list = None, base_url: str = None, min_scale: float = MIN_SCALE,
+                max_passes: int = MAX_PASSES, **options) -> tuple:
+    """
+    Find the largest scale at which prepared HTML fits one letter page and return the
+    (document, scale) pair; write the document with zoom=scale.
+
+    The first pass lays out at full size. If the poster overflows, its measured extent gives
+    a first guess, and a binary search between min_scale and 1 refines it, using at most
+    max_passes layouts (plus one at min_scale if none of them fits, which is then returned).
+    """
+    html = simplify.strip_scripts(html)
+    document = layout(html, 1.0, css, base_url, **options)
+    if fits(document):
+        return document, 1.0
+
+    page = document.pages[0]
+    right, bottom = content_extent(page)
+    heights = bottom + page.height * (len(document.pages) - 1)
+    guess = min(page.width / max(right, 1), page.height / max(heights, 1), 1.0)
+
+    low, high = min_scale, 1.0
+    best = last = None
+    scale = max(guess, min_scale)
+    for _ in range(max_passes - 1):
+        last = (layout(html, scale, css, base_url, **options), scale)
+        if fits(last[0]):
+            best, low = last, scale
+        else:
+            high = scale
+        if high - low < 0.01:
+            break
+        scale = (low + high) / 2
+
+    if best is None:
+        logging.warning(f"Poster does not fit one page even at scale {min_scale}; using that scale.")
+        best = last if last and last[1] == min_scale else (layout(html, min_scale, css, base_url, **options), min_scale)
+    logging.info(f"Fitted poster to one page at scale {best[1]:.3f}")
+    return best
\ No newline at end of file
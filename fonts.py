@@ -0,0 +1,151 @@
+import os
+import re
+import sys
+import glob
+import logging
+import threading
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+import unsplash
+import download
+
+FONT_DIR = os.getenv("FONT_BUNDLE_DIR", "fonts")
+# The bundle is installed with `python fonts.py`; set LOCAL_FONTS=0 to always use Google Fonts
+LOCAL_FONTS = os.getenv("LOCAL_FONTS", "1") != "0"
+
+# Families our generated posters use, with the weights to bundle
+BUNDLED_FAMILIES = {
+    "Roboto": [400, 700],
+    "Montserrat": [400, 700],
+    "Open Sans": [400, 700],
+    "Lato": [400, 700],
+    "Poppins": [400, 700],
+    "Playfair Display": [400, 700],
+}
+
+GOOGLE_FONTS_CSS_URL = "https://fonts.googleapis.com/css2"
+# An old user agent makes Google Fonts serve plain TrueType instead of WOFF2
+TRUETYPE_USER_AGENT = "Mozilla/5.0 (Windows NT 6.1) AppleWebKit/534.30 (KHTML, like Gecko) Safari/534.30"
+
+CSS_IMPORT_PATTERN = re.compile(
+    r"""@import\s+(?:url\(\s*)?["']?(https?://fonts\.googleapis\.com/[^"')\s]+)["']?\s*\)?\s*;""", re.IGNORECASE)
+LINK_PATTERN = re.compile(r"""<link\b[^>]*\bhref\s*=\s*["'](https?://fonts\.(?:googleapis|gstatic)\.com[^"']*)["'][^>]*>""",
+                          re.IGNORECASE)
+
+_warned = set()
+_warned_lock = threading.Lock()
+
+def _warn_once(message: str):
+    """Log a warning the first time it comes up in this process; renders repeat the same fonts."""
+    with _warned_lock:
+        if message in _warned:
+            return
+        _warned.add(message)
+    logging.warning(message)
+
+def font_filename(family: str, weight: int, style: str = "normal") -> str:
+    return f"{family.replace(' ', '_')}-{weight}-{style}.ttf"
+
+def bundled_faces(font_dir: str = FONT_DIR) -> dict:
+    """Map each bundled family to its (weight, style, path) faces, read from the bundle file names."""
+    faces = {}
+    for path in sorted(glob.glob(os.path.join(font_dir, "*.ttf"))):
+        match = re.match(r"(.+)-(\d+)-(normal|italic)\.ttf$", os.path.basename(path))
+        if match:
+            family = match.group(1).replace("_", " ")
+            faces.setdefault(family, []).append((int(match.group(2)), match.group(3), path))
+    return faces
+
+def families_in_url(url: str) -> list:
+    """Family names requested by a Google Fonts CSS URL (css and css2 syntax)."""
+    families = []
+    for value in parse_qs(urlparse(url).query).get("family", []):
+        for family in value.split("|"):
+            name = family.split(":")[0].replace("+", " ").strip()
+            if name:
+                families.append(name)
+    return families
+
+def font_face_rules(families: list, font_dir: str = FONT_DIR) -> str:
+    """@font-face rules pointing at bundled files for the requested families."""
+    faces = bundled_faces(font_dir)
+    rules = []
+    for family in families:
+        if family not in faces:
+            _warn_once(f"Font '{family}' is not in the local bundle; falling back to the CSS font stack.")
+            continue
+        for weight, style, path in faces[family]:
+            rules.append(f"@font-face {{ font-family: '{family}'; font-weight: {weight}; font-style: {style}; "
+                         f"src: url('{Path(path).resolve().as_uri()}') format('truetype'); }}")
+    return "\n".join(rules)
+
+def local_font_rules(url: str, font_dir: str = FONT_DIR) -> str:
+    """@font-face rules replacing a Google Fonts CSS URL, or None unless every family it asks for is bundled."""
+    families = families_in_url(url)
+    missing = [family for family in families if family not in bundled_faces(font_dir)]
+    if not families or missing:
+        _warn_once(f"Fonts {missing or url} are not in the local bundle; loading them from Google Fonts.")
+        return None
+    return font_face_rules(families, font_dir)
+
+def localize_fonts(text: str, font_dir: str = FONT_DIR) -> str:
+    """
+    Replace Google Fonts @import rules (in CSS or HTML) and <link> tags (in HTML) with
+    local @font-face rules, so rendering never waits on the network. A reference asking
+    for any family missing from the bundle is left as it is (and fetched through the
+    caching url_fetcher), so the poster still gets its fonts. Text is returned unchanged
+    when LOCAL_FONTS is off or no bundle has been installed in font_dir.
+    """
+    if not LOCAL_FONTS or not (CSS_IMPORT_PATTERN.search(text) or LINK_PATTERN.search(text)):
+        return text
+    if not bundled_faces(font_dir):
+        _warn_once(f"No font bundle in {font_dir}; fonts load from Google Fonts. "
+                   "Run `python fonts.py` once with network access to install it.")
+        return text
+
+    def replace_import(match):
+        rules = local_font_rules(match.group(1), font_dir)
+        return match.group(0) if rules is None else rules
+
+    def replace_link(match):
+        if "googleapis" not in match.group(1):
+            return ""  # preconnect hints for fonts.gstatic.com
+        rules = local_font_rules(match.group(1), font_dir)
+        return match.group(0) if rules is None else f"<style>\n{rules}\n</style>"
+
+    text = CSS_IMPORT_PATTERN.sub(replace_import, text)
+    return LINK_PATTERN.sub(replace_link, text)
+
+def install_family(family: str, weights: list, font_dir: str = FONT_DIR) -> list:
+    """Download the TrueType files for a family into the bundle. Needs network access once."""
+    os.makedirs(font_dir, exist_ok=True)
+    spec = f"{family}:wght@{';'.join(str(weight) for weight in weights)}"
+    response = unsplash.get_session().get(GOOGLE_FONTS_CSS_URL, params={"family": spec},
+                                          headers={"User-Agent": TRUETYPE_USER_AGENT}, timeout=30)
+    response.raise_for_status()
+
+    installed = []
+    for block in re.findall(r"@font-face\s*{([^}]*)}", response.text):
+        weight = re.search(r"font-weight:\s*(\d+)", block)
+        style = re.search(r"font-style:\s*(\w+)", block)
+        src = re.search(r"url\((https://[^)]+)\)", block)
+        if not (weight and src):
+            continue
+        dest = os.path.join(font_dir, font_filename(family, int(weight.group(1)), style.group(1) if style else "normal"))
+        if not os.path.exists(dest):
+            download.download_to_file(src.group(1), dest)
+        installed.append(dest)
+    return installed
+
+def install_bundle(font_dir: str = FONT_DIR):
+    """Populate the local font bundle with every family in BUNDLED_FAMILIES."""
+    for family, weights in BUNDLED_FAMILIES.items():
+        try:
+            files = install_family(family, weights, font_dir)
+            logging.info(f"Installed {len(files)} font files for {family}")
+        except Exception as e:
+            logging.error(f"Error installing font {family}: {e}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    install_bundle(sys.argv[1] if len(sys.argv) > 1 else FONT_DIR)
\ No newline at end of file
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+import unsplash
+import download
+import palette
+import cache_files
+
+DEFAULT_STORE_DIR = os.path.join("images", "store")
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+# Search results compared against the club color scheme before picking one
+SCHEME_CANDIDATES = 5
+
+def url_hash(url: str) -> str:
+    """Short stable hash of an image URL."""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+
+class ImageStore:
+    """
+    Content-addressed image store keyed by Unsplash photo ID and URL hash.
+
+    Files live in root/<key>.<ext> and an index.json beside them records metadata
+    (dimensions, dominant colors, source keyword) and last access times. The store is
+    capped at max_bytes and evicts least recently used images first.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, "index.json")
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+        self._index = self._load_index()
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as index_file:
+                index = json.load(index_file)
+        except FileNotFoundError:
+            index = {}
+        except Exception as e:
+            logging.error(f"Error reading image store index, starting empty: {e}")
+            index = {}
+        index.setdefault("photos", {})
+        index.setdefault("keywords", {})
+        # Drop entries whose files were removed behind our back
+        for key, meta in list(index["photos"].items()):
+            if not os.path.exists(os.path.join(self.root, meta["file"])):
+                del index["photos"][key]
+        return index
+
+    def _save_index(self, keep: str = None):
+        """
+        Merge the index with the one on disk and write it back. Render workers share a store,
+        so this happens under a file lock and keeps entries other processes added meanwhile.
+        """
+        with cache_files.file_lock(self.index_path + ".lock"):
+            index = self._load_index()
+            for key, meta in self._index["photos"].items():
+                if key in index["photos"]:
+                    meta["last_access"] = max(meta["last_access"], index["photos"][key]["last_access"])
+                # Skip images another process evicted
+                if os.path.exists(self.path_for(meta)):
+                    index["photos"][key] = meta
+            index["keywords"].update(self._index["keywords"])
+            self._index = index
+            self._evict(keep)
+            cache_files.write_atomic(self.index_path, json.dumps(self._index, indent=2).encode("utf-8"))
+
+    @staticmethod
+    def make_key(photo_id: str, url: str) -> str:
+        return f"{photo_id}_{url_hash(url)}" if photo_id else url_hash(url)
+
+    def path_for(self, meta: dict) -> str:
+        return os.path.join(self.root, meta["file"])
+
+    def _touch(self, key: str) -> dict:
+        meta = self._index["photos"][key]
+        meta["last_access"] = time.time()
+        return meta
+
+    def lookup(self, photo_id: str = None, url: str = None) -> dict:
+        """Find a stored image by exact URL, or by photo ID when no URL is given."""
+        with self._lock:
+            photos = self._index["photos"]
+            if url:
+                key = self.make_key(photo_id, url)
+                if key not in photos:
+                    key = next((k for k, meta in photos.items() if meta["url"] == url), None)
+                return self._touch(key) if key else None
+            if photo_id:
+                key = next((k for k, meta in photos.items() if meta.get("photo_id") == photo_id), None)
+                return self._touch(key) if key else None
+        return None
+
+    def lookup_keyword(self, keyword: str) -> dict:
+        """Return the image previously selected for a keyword, if it is still stored."""
+        with self._lock:
+            key = self._index["keywords"].get(keyword.strip().lower())
+            if key and key in self._index["photos"]:
+                return self._touch(key)
+        return None
+
+    def remember_keyword(self, keyword: str, meta: dict):
+        with self._lock:
+            self._index["keywords"][keyword.strip().lower()] = meta["key"]
+            self._save_index()
+
+    def add(self, data: bytes, url: str, photo_id: str = None, keyword: str = None) -> dict:
+        """Store image bytes and their metadata, evicting old images if over the size cap."""
+        with cache_files.temp_file(os.path.join(self.root, self.make_key(photo_id, url))) as img_file:
+            img_file.write(data)
+        return self.add_file(img_file.name, url, photo_id, keyword)
+
+    def add_file(self, path: str, url: str, photo_id: str = None, keyword: str = None, stats: dict = None) -> dict:
+        """Move a downloaded image file into the store and record its metadata."""
+        key = self.make_key(photo_id, url)
+        with Image.open(path) as image:
+            ext = (image.format or "jpeg").lower().replace("jpeg", "jpg")
+            width, height = image.width, image.height
+            colors = palette.extract_palette(image)
+        meta = {
+            "key": key,
+            "photo_id": photo_id,
+            "url": url,
+            "file": f"{key}.{ext}",
+            "bytes": os.path.getsize(path),
+            "width": width,
+            "height": height,
+            "dominant_colors": [color for color, _ in colors],
+            "color_weights": [weight for _, weight in colors],
+            "keyword": keyword,
+            "created": time.time(),
+            "last_access": time.time(),
+        }
+        if stats:
+            meta["download_seconds"] = stats["seconds"]
+            meta["download_bytes_per_second"] = stats["bytes_per_second"]
+        with self._lock:
+            os.replace(path, self.path_for(meta))
+            self._index["photos"][key] = meta
+            if keyword:
+                self._index["keywords"][keyword.strip().lower()] = key
+            self._save_index(keep=key)
+        return meta
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(meta["bytes"] for meta in self._index["photos"].values())
+
+    def _evict(self, keep: str = None):
+        """Remove least recently used images until the store fits in max_bytes."""
+        photos = self._index["photos"]
+        total = sum(meta["bytes"] for meta in photos.values())
+        for key, meta in sorted(photos.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(self.path_for(meta))
+            except FileNotFoundError:
+                pass
+            total -= meta["bytes"]
+            del photos[key]
+            logging.info(f"Evicted cached image {key}")
+        self._index["keywords"] = {k: v for k, v in self._index["keywords"].items() if v in photos}
+
+    def fetch(self, result: dict, variant: str = "regular", url: str = None) -> dict:
+        """
+        Return stored metadata for an Unsplash search result, downloading it only on a miss.
+        url overrides the variant, e.g. with one chosen by unsplash.select_variant_url.
+        """
+        url = url or result["urls"][variant]
+        meta = self.lookup(result.get("id"), url)
+        if meta:
+            if result.get("keyword"):
+                self.remember_keyword(result["keyword"], meta)
+            return meta
+
+        # A leftover .download.part file from an interrupted run is resumed
+        download_path = os.path.join(self.root, f"{self.make_key(result.get('id'), url)}.download")
+        stats = download.download_to_file(url, download_path)
+        return self.add_file(download_path, url, result.get("id"), result.get("keyword"), stats)
+
+    def image_for_keywords(self, keywords: list, slot: str = "hero", color_scheme: str = None) -> str:
+        """
+        Return a local image path for the first keyword that has a stored image,
+        otherwise search Unsplash and store the best result at the size its image slot needs.
+        With a color scheme, several results are compared on their cached thumbnails first.
+        """
+        for keyword in keywords:
+            meta = self.lookup_keyword(keyword)
+            if meta:
+                with self._lock:
+                    self._save_index()
+                return self.path_for(meta)
+
+        per_page = SCHEME_CANDIDATES if color_scheme else 1
+        results = unsplash.search_keywords(keywords, per_page=per_page, max_images=per_page)
+        if not results:
+            return None
+
+        best = results[0]
+        if color_scheme and len(results) > 1:
+            best = self.best_for_scheme(results, color_scheme) or best
+        return self.path_for(self.fetch(best, url=unsplash.select_variant_url(best, slot)))
+
+    def best_for_scheme(self, results: list, color_scheme: str) -> dict:
+        """Pick the search result whose thumbnail palette best matches a color scheme."""
+        def thumbnail(result):
+            try:
+                # Thumbnails are stored without a keyword so they never answer keyword lookups
+                return dict(self.fetch(dict(result, keyword=None), variant="thumb"), result=result)
+            except Exception as e:
+                logging.error(f"Error fetching thumbnail for {result.get('id')}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=len(results)) as executor:
+            thumbnails = [thumb for thumb in executor.map(thumbnail, results) if thumb]
+        ranked = palette.rank_by_scheme(thumbnails, color_scheme)
+        return ranked[0]["result"] if ranked else None
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(output_folder: str = "images", max_bytes: int = DEFAULT_MAX_BYTES) -> ImageStore:
+    """Return the shared ImageStore for an output folder."""
+    root = os.path.join(output_folder, "store")
+    with _stores_lock:
+        if root not in _stores:
+            _stores[root] = ImageStore(root, max_bytes)
+        return _stores[root]
\ No newline at end of file
@@ -0,0 +1,156 @@
+import os
+import re
+import json
+import logging
+import threading
+from PIL import Image
+import image_cache
+import preprocess
+import palette
+from keyword_extraction import normalize_tag
+
+LIBRARY_INDEX_PATH = os.path.join("cache", "image_library.json")
+# Admins drop curated images here, optionally with a tags.json mapping file names to tag lists
+ADMIN_LIBRARY_DIR = os.getenv("IMAGE_LIBRARY_DIR", os.path.join("images", "library"))
+TAGS_FILE = "tags.json"
+SKIP_DIRS = {"store"}
+
+def tokenize(text: str) -> set:
+    return {normalize_tag(token) for token in re.findall(r"[a-zA-Z]+", text) if len(token) > 1}
+
+class ImageLibrary:
+    """
+    Offline index of local images with keyword tags and color features.
+
+    Tags come from file and folder names plus any tags.json sidecar file. The index is
+    persisted and only images whose size or modification time changed are re-read.
+    """
+
+    def __init__(self, roots: list = None, index_path: str = LIBRARY_INDEX_PATH):
+        self.roots = roots or [ADMIN_LIBRARY_DIR, "images"]
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._images = self._load_index()
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as index_file:
+                return json.load(index_file)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.error(f"Error reading image library index, rebuilding: {e}")
+            return {}
+
+    def _save_index(self):
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as index_file:
+            json.dump(self._images, index_file, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _walk(self):
+        seen = set()
+        for root in self.roots:
+            if not os.path.isdir(root):
+                continue
+            for dirpath, dirnames, files in os.walk(root):
+                dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+                sidecar = {}
+                if TAGS_FILE in files:
+                    try:
+                        with open(os.path.join(dirpath, TAGS_FILE), 'r', encoding='utf-8') as tags_file:
+                            sidecar = json.load(tags_file)
+                    except Exception as e:
+                        logging.error(f"Error reading {os.path.join(dirpath, TAGS_FILE)}: {e}")
+                for file in files:
+                    path = os.path.normpath(os.path.join(dirpath, file))
+                    if path in seen or not file.lower().endswith(preprocess.IMAGE_EXTENSIONS):
+                        continue
+                    seen.add(path)
+                    folder_tags = tokenize(os.path.relpath(dirpath, root)) if dirpath != root else set()
+                    tags = tokenize(os.path.splitext(file)[0]) | folder_tags
+                    tags |= {normalize_tag(tag) for tag in sidecar.get(file, [])}
+                    yield path, sorted(tags)
+
+    def refresh(self) -> int:
+        """Re-index new or changed images and drop removed ones. Returns the number indexed."""
+        with self._lock:
+            current = {}
+            changed = False
+            for path, tags in self._walk():
+                stat = os.stat(path)
+                entry = self._images.get(path)
+                if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                    if entry["tags"] != tags:
+                        entry["tags"] = tags
+                        changed = True
+                    current[path] = entry
+                    continue
+                try:
+                    with Image.open(path) as image:
+                        colors = palette.extract_palette(image)
+                        current[path] = {
+                            "mtime": stat.st_mtime,
+                            "size": stat.st_size,
+                            "tags": tags,
+                            "width": image.width,
+                            "height": image.height,
+                            "dominant_colors": [color for color, _ in colors],
+                            "color_weights": [weight for _, weight in colors],
+                        }
+                    changed = True
+                except Exception as e:
+                    logging.error(f"Error indexing library image {path}: {e}")
+            if changed or current.keys() != self._images.keys():
+                self._images = current
+                self._save_index()
+            return len(self._images)
+
+    def query(self, keywords: list, limit: int = 5) -> list:
+        """
+        Return (path, metadata) pairs for images whose tags match the keywords, best first.
+        Earlier keywords weigh more, matching the order keywords are extracted in.
+        """
+        scored = []
+        with self._lock:
+            for path, entry in self._images.items():
+                tags = set(entry["tags"])
+                score = 0.0
+                for i, keyword in enumerate(keywords):
+                    tokens = tokenize(keyword)
+                    if tokens and tokens <= tags:
+                        score += 2.0 / (1 + i)
+                    elif tokens & tags:
+                        score += len(tokens & tags) / len(tokens) / (1 + i)
+                if score > 0:
+                    scored.append((score, path, dict(entry, score=score)))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(path, entry) for _, path, entry in scored[:limit]]
+
+_library = None
+_library_lock = threading.Lock()
+
+def get_library() -> ImageLibrary:
+    """Return the shared image library, indexing it on first use."""
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = ImageLibrary()
+            _library.refresh()
+    return _library
+
+def find_image(keywords: list, output_folder: str = "images", color_scheme: str = None) -> str:
+    """
+    Resolve keywords to a local image path: the offline library first, then the
+    Unsplash-backed image store. Equally good keyword matches are ordered by how well
+    they fit the color scheme. Returns None if neither source has a match.
+    """
+    matches = get_library().query(keywords)
+    if matches:
+        best_score = matches[0][1]["score"]
+        tied = [dict(entry, path=path) for path, entry in matches if entry["score"] == best_score]
+        path = palette.rank_by_scheme(tied, color_scheme)[0]["path"]
+        logging.info(f"Using library image {path} for keywords {keywords}")
+        return path
+    return image_cache.get_store(output_folder).image_for_keywords(keywords, color_scheme=color_scheme)
\ No newline at end of file
@@ -1,11 +1,13 @@
 import os
 import openai
-import requests
-from weasyprint import HTML, CSS
+from weasyprint import HTML
+import stylesheets
 import logging
 from dotenv import load_dotenv
 import asyncio
 import kagglehub
+import unsplash
+import keyword_extraction
 
 # Download latest version
 path = kagglehub.dataset_download("groffo/ads16-dataset")
@@ -117,8 +119,14 @@ async def generate_content(club_info: dict, document_type: str) -> str:
 
 def extract_keywords(club_info: dict) -> list:
     """
-    Use GPT to extract relevant keywords from the club info for image search.
+    Extract relevant keywords from the club info for image search. A local extractor is
+    used when it is confident enough; otherwise GPT extracts them.
     """
+    local_keywords, confidence = keyword_extraction.extract_local_keywords(club_info)
+    if confidence >= keyword_extraction.MIN_CONFIDENCE or not keyword_extraction.LLM_FALLBACK:
+        logging.info(f"Using locally extracted keywords (confidence {confidence:.2f})")
+        return local_keywords
+
     prompt = f"""
     Analyze the following club information and extract 5-10 keywords that describe the club visually:
     Name: {club_info.get('name', 'N/A')}
@@ -141,25 +149,17 @@ def extract_keywords(club_info: dict) -> list:
         return keywords
     except Exception as e:
         logging.error(f"Error extracting keywords: {e}")
-        return []
+        return local_keywords
 
 def search_unsplash(keywords: list, per_page: int = 5) -> list:
     """
     Search Unsplash for images based on keywords.
     """
-    base_url = "https://api.unsplash.com/search/photos"
-    headers = {"Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"}
     images = []
 
     try:
-        for keyword in keywords:
-            params = {"query": keyword, "per_page": per_page}
-            response = requests.get(base_url, headers=headers, params=params)
-            if response.status_code == 200:
-                results = response.json()["results"]
-                images.extend([result["urls"]["regular"] for result in results])
-            else:
-                logging.error(f"Unsplash API error for keyword '{keyword}': {response.status_code}")
+        results = unsplash.search_keywords(keywords, per_page=per_page)
+        images.extend([result["urls"]["regular"] for result in results])
     except Exception as e:
         logging.error(f"Error searching Unsplash: {e}")
 
@@ -184,7 +184,7 @@ def create_pdf(content: str, filename: str):
     if not content:
         raise ValueError("HTML content is empty. Cannot create PDF.")
     
-    css = CSS(string=f"""
+    css = stylesheets.get_stylesheet(f"""
         @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@400;700&family=Montserrat:wght@400;700&display=swap');
         @page {{
             size: letter;
@@ -234,7 +234,7 @@ def create_pdf(content: str, filename: str):
     """)
 
     try:
-        HTML(string=content).write_pdf(filename, stylesheets=[css])
+        HTML(string=content).write_pdf(filename, stylesheets=[css], font_config=stylesheets.get_font_config())
         logging.info(f"PDF created successfully: {filename}")
     except Exception as e:
         logging.error(f"Error creating PDF: {e}")
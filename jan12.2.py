@@ -1,12 +1,14 @@
 import os
 import openai
 import requests
-from weasyprint import HTML, CSS
+from weasyprint import HTML
+import stylesheets
 import logging
 from dotenv import load_dotenv
 import asyncio
 from PyPDF2 import PdfReader
 import re
+import keyword_extraction
 
 # Load environment variables
 load_dotenv()
@@ -62,8 +64,14 @@ def load_templates_and_ads(template_dir: str) -> dict:
 
 def extract_keywords(club_info: dict) -> list:
     """
-    Use GPT to extract relevant keywords from the club info for image search.
+    Extract relevant keywords from the club info for image search. A local extractor is
+    used when it is confident enough; otherwise GPT extracts them.
     """
+    local_keywords, confidence = keyword_extraction.extract_local_keywords(club_info)
+    if confidence >= keyword_extraction.MIN_CONFIDENCE or not keyword_extraction.LLM_FALLBACK:
+        logging.info(f"Using locally extracted keywords (confidence {confidence:.2f})")
+        return local_keywords
+
     prompt = f"""
     Analyze the following club information and extract 5-10 keywords that describe the club visually:
     Name: {club_info.get('name', 'N/A')}
@@ -86,7 +94,7 @@ def extract_keywords(club_info: dict) -> list:
         return keywords
     except Exception as e:
         logging.error(f"Error extracting keywords: {e}")
-        return []
+        return local_keywords
 
 def search_unsplash(keywords: list, output_folder: str, per_page: int = 5) -> None:
     """
@@ -259,7 +267,7 @@ def create_pdf(content: str, filename: str):
     if not content:
         raise ValueError("HTML content is empty. Cannot create PDF.")
     
-    css = CSS(string=f"""
+    css = stylesheets.get_stylesheet(f"""
         @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@400;700&family=Montserrat:wght@400;700&display=swap');
         @page {{
             size: letter;
@@ -309,7 +317,7 @@ def create_pdf(content: str, filename: str):
     """)
 
     try:
-        HTML(string=content).write_pdf(filename, stylesheets=[css])
+        HTML(string=content).write_pdf(filename, stylesheets=[css], font_config=stylesheets.get_font_config())
         logging.info(f"PDF created successfully: {filename}")
     except Exception as e:
         logging.error(f"Error creating PDF: {e}")
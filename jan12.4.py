@@ -10,6 +10,7 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 import asyncio
 from PyPDF2 import PdfReader
+import keyword_extraction
 
 # Load environment variables
 load_dotenv()
@@ -65,8 +66,14 @@ def load_templates_and_ads(template_dir: str) -> dict:
 
 def extract_keywords(club_info: dict) -> list:
     """
-    Use GPT to extract relevant keywords from the club info for image search.
+    Extract relevant keywords from the club info for image search. A local extractor is
+    used when it is confident enough; otherwise GPT extracts them.
     """
+    local_keywords, confidence = keyword_extraction.extract_local_keywords(club_info)
+    if confidence >= keyword_extraction.MIN_CONFIDENCE or not keyword_extraction.LLM_FALLBACK:
+        logging.info(f"Using locally extracted keywords (confidence {confidence:.2f})")
+        return local_keywords
+
     prompt = f"""
     Analyze the following club information and extract 5-10 keywords that describe the club visually:
     Name: {club_info.get('name', 'N/A')}
@@ -89,7 +96,7 @@ def extract_keywords(club_info: dict) -> list:
         return keywords
     except Exception as e:
         logging.error(f"Error extracting keywords: {e}")
-        return []
+        return local_keywords
 
 def search_unsplash(keywords: list, output_folder: str, per_page: int = 5) -> None:
     """
@@ -0,0 +1,108 @@
+import os
+import re
+from collections import defaultdict
+
+# Below this confidence the scripts fall back to the GPT keyword prompt
+MIN_CONFIDENCE = float(os.getenv("LOCAL_KEYWORD_MIN_CONFIDENCE", "0.6"))
+LLM_FALLBACK = os.getenv("KEYWORD_LLM_FALLBACK", "1") != "0"
+# Distinct visual nouns needed for full confidence
+CONFIDENT_NOUN_COUNT = 5
+MAX_KEYWORDS = 10
+
+CLUB_FIELDS = ("name", "tagline", "mission", "purpose", "audience", "key activities", "activities")
+
+STOPWORDS = set("""
+a about above across after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each every few for from further had has
+have having he her here hers him his how i if in into is it its itself just like make more most my no nor
+not of off on once only or other our ours out over own same she should so some such than that the their
+them then there these they this those through to too under until up very via was we well were what when
+where which while who whom why will with within without would you your yours
+all-ages everyone anyone someone people individual members member club clubs
+""".split())
+
+# Nouns that make good image-search queries. Matched after plural stripping.
+VISUAL_NOUNS = set("""
+art baking bake barbecue bbq bread cake chef cookie cooking cuisine culinary dessert dinner food garden
+gastronomy grill kitchen meal pastry picnic pizza recipe restaurant vegetable fruit farm market coffee tea
+music band choir concert guitar piano violin drum singing song dance dancing theater theatre drama stage
+film movie camera photography painting drawing sculpture pottery craft design fashion book reading library
+poetry writing journalism newspaper science chemistry biology physics lab laboratory robot robotic coding
+programming computer technology engineering math astronomy telescope space rocket nature hiking mountain
+forest outdoor camping environment recycling sustainability ocean beach river wildlife animal soccer
+basketball football baseball tennis volleyball swimming running yoga fitness sport chess game gaming debate
+volunteer volunteering charity fundraiser fundraising travel culture language festival celebration party
+community friendship teamwork leadership business entrepreneurship finance investing medicine health
+hospital competition trophy award workshop classroom student mentorship
+""".split())
+
+def normalize_tag(word: str) -> str:
+    """Lowercase a tag and strip simple plural endings so "cookies" matches "cookie"."""
+    word = word.strip().lower()
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def _phrases(text: str) -> list:
+    """Split text into RAKE candidate phrases at punctuation and stopwords."""
+    phrases = []
+    for fragment in re.split(r"[.,;:!?()\"\[\]/\n\-–—]+", text.lower()):
+        current = []
+        for word in re.findall(r"[a-z][a-z'&]*", fragment):
+            if word in STOPWORDS or len(word) < 3:
+                if current:
+                    phrases.append(current)
+                current = []
+            else:
+                current.append(word)
+        if current:
+            phrases.append(current)
+    return phrases
+
+def _rake_scores(phrases: list) -> dict:
+    """RAKE word scores: co-occurrence degree divided by frequency."""
+    frequency = defaultdict(int)
+    degree = defaultdict(int)
+    for phrase in phrases:
+        for word in phrase:
+            frequency[word] += 1
+            degree[word] += len(phrase)
+    return {word: degree[word] / frequency[word] for word in frequency}
+
+def extract_local_keywords(club_info: dict, max_keywords: int = MAX_KEYWORDS) -> tuple:
+    """
+    Extract image-search keywords from the club info without an API call.
+
+    Nouns from a curated visual lexicon come first, most frequent first, followed by short
+    phrases ranked with RAKE (visual phrases boosted). Returns (keywords, confidence), where
+    confidence reflects how many distinct visual nouns were found.
+    """
+    text = "\n".join(str(club_info[field]) for field in CLUB_FIELDS if club_info.get(field))
+    phrases = _phrases(text)
+    word_scores = _rake_scores(phrases)
+
+    noun_counts = defaultdict(int)
+    noun_words = {}
+    phrase_scores = {}
+    for phrase in phrases:
+        visual = False
+        for word in phrase:
+            noun = normalize_tag(word)
+            if noun in VISUAL_NOUNS:
+                visual = True
+                noun_counts[noun] += 1
+                noun_words.setdefault(noun, word)
+        if len(phrase) == 2:
+            keyword = " ".join(phrase)
+            score = sum(word_scores[word] for word in phrase) * (2 if visual else 1)
+            phrase_scores[keyword] = max(score, phrase_scores.get(keyword, 0))
+
+    # Dicts keep first-mention order, so the sort is stable on ties
+    nouns = sorted(noun_counts, key=lambda noun: -noun_counts[noun])
+    keywords = [noun_words[noun] for noun in nouns]
+    keywords += sorted(phrase_scores, key=lambda keyword: -phrase_scores[keyword])
+    keywords = list(dict.fromkeys(keywords))[:max_keywords]
+    confidence = min(1.0, len(nouns) / CONFIDENT_NOUN_COUNT)
+    return keywords, confidence
\ No newline at end of file
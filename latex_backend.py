@@ -0,0 +1,461 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, Future
+import preprocess
+import render_cache
+
+MAX_CONCURRENT = int(os.getenv("LATEX_WORKERS", max(1, min(4, os.cpu_count() or 1))))
+DEFAULT_TIMEOUT = 60
+
+FORMAT_DIR = os.path.join("cache", "latex_formats")
+USE_FORMATS = os.getenv("LATEX_FORMATS", "1") == "1"
+# A preamble gets its own precompiled format once it has been seen this many times
+FORMAT_MIN_USES = int(os.getenv("LATEX_FORMAT_MIN_USES", 2))
+
+PDF_CACHE_DIR = os.path.join("cache", "latex_pdfs")
+PDF_CACHE_MAX_BYTES = 128 * 1024 * 1024
+# Documents that failed to compile, remembered so the same source fails without another run
+MAX_REMEMBERED_FAILURES = 128
+
+PDFLATEX_FLAGS = ["-interaction=nonstopmode", "-halt-on-error", "-file-line-error", "-no-shell-escape"]
+ERROR_LINE_PATTERN = re.compile(r"^(?:!|.+:\d+:).*$", re.MULTILINE)
+BEGIN_DOCUMENT_PATTERN = re.compile(r"\\begin\s*\{document\}")
+COMMENT_PATTERN = re.compile(r"(?<!\\)%.*$", re.MULTILINE)
+VERBATIM_PATTERN = re.compile(r"\\begin\{(verbatim\*?|lstlisting|minted|comment)\}.*?\\end\{\1\}", re.DOTALL)
+VERB_PATTERN = re.compile(r"\\verb\*?([^A-Za-z\s*]).*?\1")
+# hyperref reads URL arguments verbatim, so #, & and % in them need no escaping
+URL_PATTERN = re.compile(r"(\\(?:href|url)\s*\{)([^{}]*)\}")
+TOKEN_PATTERN = re.compile(r"\\(begin|end)\s*\{([^{}]*)\}|\\(?:[A-Za-z@]+|.)|[{}$&#]", re.DOTALL)
+ASSET_PATTERN = re.compile(r"\\(includegraphics|input|include)\*?\s*(?:\[[^\]]*\])?\s*\{([^{}]+)\}")
+DEFINITION_PATTERN = re.compile(r"\\(?:(?:re)?newcommand|providecommand|(?:re)?newenvironment|def)(?![A-Za-z])")
+CONTROL_PATTERN = re.compile(r"[\x00-\x08\x0b\x0e-\x1f\x7f]")
+
+# Environments in which & separates cells
+ALIGNMENT_ENVIRONMENTS = {
+    "tabular", "tabular*", "tabularx", "longtable", "array", "align", "align*", "alignat", "alignat*",
+    "aligned", "flalign", "flalign*", "eqnarray", "eqnarray*", "split", "cases",
+    "matrix", "pmatrix", "bmatrix", "Bmatrix", "vmatrix", "Vmatrix", "smallmatrix",
+}
+GRAPHICS_EXTENSIONS = ("", ".pdf", ".png", ".jpg", ".jpeg", ".PDF", ".PNG", ".JPG", ".JPEG")
+
+LATEX_ESCAPES = {
+    "\\": r"\textbackslash{}", "&": r"\&", "%": r"\%", "$": r"\$", "#": r"\#", "_": r"\_",
+    "{": r"\{", "}": r"\}", "~": r"\textasciitilde{}", "^": r"\textasciicircum{}",
+}
+ESCAPE_PATTERN = re.compile("|".join(re.escape(character) for character in LATEX_ESCAPES))
+
+class LatexError(RuntimeError):
+    """A failed pdflatex run, with the captured log."""
+
+    def __init__(self, message: str, log: str = ""):
+        super().__init__(message)
+        self.log = log
+
+    def errors(self) -> list:
+        """The error lines pdflatex reported."""
+        return ERROR_LINE_PATTERN.findall(self.log)
+
+def escape_latex(text) -> str:
+    """Escape text for a LaTeX document so that values like "$10,000" or "R&D" typeset literally."""
+    return ESCAPE_PATTERN.sub(lambda match: LATEX_ESCAPES[match.group(0)], str(text))
+
+def _find_asset(command: str, name: str) -> str:
+    """The local file an \\includegraphics or \\input refers to, trying the extensions TeX would."""
+    extensions = GRAPHICS_EXTENSIONS if command == "includegraphics" else (".tex", "")
+    for extension in extensions:
+        path = name.strip() + extension
+        if os.path.isfile(path):
+            return path
+    return None
+
+def validate_latex(tex: str, jobname: str = "poster") -> list:
+    """
+    Cheap checks for the mistakes that would otherwise only show up after a full pdflatex
+    run: unescaped & and # in the document text (URLs aside), an unmatched $, unbalanced
+    braces or environments, no \\documentclass or \\begin{document}, control characters
+    (a "\\v" or "\\t" that Python turned into whitespace) and missing \\includegraphics files.
+    Returns the problems as "file:line: message" strings, empty if there are none.
+    """
+    blank = lambda match: "\n" * match.group(0).count("\n")
+    source = VERBATIM_PATTERN.sub(blank, tex)
+    source = URL_PATTERN.sub(lambda match: match.group(1) + "\n" * match.group(2).count("\n") + "}", source)
+    source = COMMENT_PATTERN.sub("", VERB_PATTERN.sub("", source))
+    problems = []
+
+    def report(position: int, message: str):
+        problems.append((position, message))
+
+    for match in CONTROL_PATTERN.finditer(source):
+        report(match.start(), f"control character U+{ord(match.group(0)):04X} (an unescaped backslash in Python?)")
+    if "\\documentclass" not in source:
+        report(0, "no \\documentclass")
+    begin = BEGIN_DOCUMENT_PATTERN.search(source)
+    if not begin:
+        report(0, "no \\begin{document}")
+    body_start = begin.start() if begin else len(source)
+    # & and # are legitimate inside macro definitions, so only check the text of documents without any
+    check_text = not DEFINITION_PATTERN.search(source, body_start)
+
+    braces, environments, math = [], [], None
+    for match in TOKEN_PATTERN.finditer(source):
+        token, position = match.group(0), match.start()
+        if match.group(1) == "begin":
+            environments.append((match.group(2).strip(), position))
+        elif match.group(1) == "end":
+            name = match.group(2).strip()
+            if not environments:
+                report(position, f"\\end{{{name}}} without a \\begin{{{name}}}")
+                continue
+            if environments[-1][0] != name:
+                report(position, f"\\end{{{name}}} does not match \\begin{{{environments[-1][0]}}}")
+            environments.pop()
+        elif token == "{":
+            braces.append(position)
+        elif token == "}":
+            if braces:
+                braces.pop()
+            else:
+                report(position, "unmatched }")
+        elif token == "$":
+            math = position if math is None else None
+        elif token == "&" and check_text and position > body_start and \
+                not any(name in ALIGNMENT_ENVIRONMENTS for name, _ in environments):
+            report(position, "unescaped & outside a table (write \\& for an ampersand)")
+        elif token == "#" and check_text and position > body_start:
+            report(position, "unescaped # (write \\# for a hash sign)")
+    if math is not None:
+        report(math, "unmatched $ (write \\$ for a dollar sign)")
+    for position in braces:
+        report(position, "unclosed {")
+    for name, position in environments:
+        report(position, f"\\begin{{{name}}} is never closed")
+
+    if "\\graphicspath" not in source:
+        for match in ASSET_PATTERN.finditer(source):
+            if match.group(1) == "includegraphics" and _find_asset(*match.groups()) is None:
+                report(match.start(), f"image {match.group(2).strip()} not found")
+
+    return [f"{jobname}.tex:{source.count(chr(10), 0, position) + 1}: {message}"
+            for position, message in sorted(problems)]
+
+def compile_key(tex: str) -> str:
+    """Hash of a document's source and the contents of the local images and files it includes."""
+    assets = {}
+    for command, name in ASSET_PATTERN.findall(tex):
+        path = _find_asset(command, name)
+        try:
+            assets[f"{command}:{name}"] = preprocess.file_digest(path) if path else None
+        except OSError:
+            assets[f"{command}:{name}"] = None
+    payload = json.dumps({"tex": tex, "assets": assets}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def split_preamble(tex: str) -> tuple:
+    """Split a document into (preamble, body starting at \\begin{document}); preamble is None if there is none."""
+    match = BEGIN_DOCUMENT_PATTERN.search(tex)
+    if not match or "\\documentclass" not in tex[:match.start()]:
+        return None, tex
+    return tex[:match.start()], tex[match.start():]
+
+def preamble_key(preamble: str) -> str:
+    """Identify a preamble by its content, ignoring comments and whitespace."""
+    normalized = " ".join(COMMENT_PATTERN.sub("", preamble).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+def _read_log(path: str) -> str:
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as log_file:
+            return log_file.read()
+    except FileNotFoundError:
+        return ""
+
+def _run_pdflatex(source: str, jobname: str, workdir: str, timeout: float, args: list = None,
+                  env: dict = None) -> tuple:
+    """Run pdflatex on source inside workdir. Returns (returncode or None on timeout, log)."""
+    tex_path = os.path.join(workdir, f"{jobname}.tex")
+    with open(tex_path, "w", encoding="utf-8") as tex_file:
+        tex_file.write(source)
+    env = dict(os.environ, openout_any="p", TEXMFOUTPUT=workdir, **(env or {}))
+    # Options go before the input; anything else (like "&pdflatex") is the first line of input
+    options = [arg for arg in args or [] if arg.startswith("-")]
+    inputs = [arg for arg in args or [] if not arg.startswith("-")]
+    command = ["pdflatex", *PDFLATEX_FLAGS, *options, f"-output-directory={workdir}", f"-jobname={jobname}",
+               *inputs, tex_path]
+    try:
+        result = subprocess.run(command, stdin=subprocess.DEVNULL, capture_output=True, timeout=timeout, env=env)
+        returncode, output = result.returncode, result.stdout.decode("utf-8", errors="replace")
+    except subprocess.TimeoutExpired as e:
+        returncode, output = None, (e.stdout or b"").decode("utf-8", errors="replace")
+    except FileNotFoundError as e:
+        raise LatexError("pdflatex is not installed.") from e
+    return returncode, _read_log(os.path.join(workdir, f"{jobname}.log")) or output
+
+class FormatCache:
+    """
+    Precompiled pdflatex formats (.fmt) for the preambles we compile most, so a run only
+    has to typeset the document body instead of reloading every package.
+
+    Preambles are counted in an index next to the formats; once one has been seen
+    FORMAT_MIN_USES times its format is dumped with pdflatex -ini. The index also keeps
+    average compile times with and without the format, from which report() estimates
+    the time saved.
+    """
+
+    def __init__(self, format_dir: str = FORMAT_DIR, min_uses: int = FORMAT_MIN_USES):
+        self.format_dir = os.path.abspath(format_dir)
+        self.min_uses = min_uses
+        self.index_path = os.path.join(self.format_dir, "index.json")
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        os.makedirs(self.format_dir, exist_ok=True)
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as index_file:
+                self.index = json.load(index_file)
+        except (FileNotFoundError, ValueError):
+            self.index = {}
+
+    def _save(self):
+        with open(self.index_path + ".tmp", "w", encoding="utf-8") as index_file:
+            json.dump(self.index, index_file, indent=2)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+    def _format_file(self, key: str) -> str:
+        return os.path.join(self.format_dir, f"{key}.fmt")
+
+    def format_for(self, preamble: str, timeout: float = DEFAULT_TIMEOUT) -> str:
+        """Return the format name to compile a preamble's documents against, or None."""
+        key = preamble_key(preamble)
+        with self._lock:
+            entry = self.index.setdefault(key, {"seen": 0, "full_runs": 0, "full_seconds": 0.0,
+                                                "format_runs": 0, "format_seconds": 0.0, "disabled": False})
+            entry["seen"] += 1
+            self._save()
+            if entry["disabled"]:
+                return None
+            if os.path.exists(self._format_file(key)):
+                return key
+            if entry["seen"] < self.min_uses:
+                return None
+        with self._build_lock:
+            if os.path.exists(self._format_file(key)) or self._build(key, preamble, timeout):
+                return key
+        with self._lock:
+            entry["disabled"] = True
+            self._save()
+        return None
+
+    def _build(self, key: str, preamble: str, timeout: float) -> bool:
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix="latex-fmt-") as workdir:
+            returncode, log = _run_pdflatex(preamble + "\n\\dump\n", key, workdir, timeout, ["-ini", "&pdflatex"])
+            built = os.path.join(workdir, f"{key}.fmt")
+            if returncode != 0 or not os.path.exists(built):
+                logging.warning(f"Could not dump LaTeX format {key}: {ERROR_LINE_PATTERN.findall(log)[:3]}")
+                return False
+            shutil.move(built, self._format_file(key))
+        logging.info(f"Built LaTeX format {key} in {time.perf_counter() - start:.2f}s")
+        return True
+
+    def env(self) -> dict:
+        """Environment that lets pdflatex find our formats ahead of the system ones."""
+        return {"TEXFORMATS": self.format_dir + os.pathsep}
+
+    def record(self, preamble: str, seconds: float, with_format: bool):
+        key = preamble_key(preamble)
+        with self._lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return
+            kind = "format" if with_format else "full"
+            entry[f"{kind}_runs"] += 1
+            entry[f"{kind}_seconds"] += seconds
+            self._save()
+        if with_format:
+            saved = self._saved_seconds(entry)
+            logging.info(f"Reused LaTeX format {key} ({entry['format_runs']} uses, ~{saved:.1f}s saved so far)")
+
+    def invalidate(self, preamble: str):
+        """Drop a format that failed to load (for example after a TeX upgrade) and stop using it."""
+        key = preamble_key(preamble)
+        with self._lock:
+            try:
+                os.remove(self._format_file(key))
+            except FileNotFoundError:
+                pass
+            if key in self.index:
+                self.index[key]["disabled"] = True
+                self._save()
+
+    @staticmethod
+    def _saved_seconds(entry: dict) -> float:
+        if not entry["full_runs"] or not entry["format_runs"]:
+            return 0.0
+        full_average = entry["full_seconds"] / entry["full_runs"]
+        format_average = entry["format_seconds"] / entry["format_runs"]
+        return (full_average - format_average) * entry["format_runs"]
+
+    def report(self) -> dict:
+        """Per-preamble reuse counts and estimated time saved, plus totals."""
+        with self._lock:
+            formats = {key: {"seen": entry["seen"], "format_uses": entry["format_runs"],
+                             "built": os.path.exists(self._format_file(key)),
+                             "saved_seconds": round(self._saved_seconds(entry), 2)}
+                       for key, entry in self.index.items()}
+        return {
+            "formats": formats,
+            "format_uses": sum(entry["format_uses"] for entry in formats.values()),
+            "saved_seconds": round(sum(entry["saved_seconds"] for entry in formats.values()), 2),
+        }
+
+_slots = threading.BoundedSemaphore(MAX_CONCURRENT)
+_format_cache = None
+_format_cache_lock = threading.Lock()
+_pdf_cache = None
+_failures = {}
+_failures_lock = threading.Lock()
+
+def get_format_cache() -> FormatCache:
+    """Return the shared LaTeX format cache."""
+    global _format_cache
+    with _format_cache_lock:
+        if _format_cache is None:
+            _format_cache = FormatCache()
+    return _format_cache
+
+def get_pdf_cache() -> render_cache.RenderCache:
+    """Return the shared cache of compiled LaTeX PDFs."""
+    global _pdf_cache
+    with _format_cache_lock:
+        if _pdf_cache is None:
+            _pdf_cache = render_cache.RenderCache(PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES)
+    return _pdf_cache
+
+def _write_log(log_path: str, log: str):
+    if log_path:
+        with open(log_path, "w", encoding="utf-8") as log_file:
+            log_file.write(log)
+
+def _compile(source: str, jobname: str, timeout: float, log_path: str, args: list = None, env: dict = None) -> bytes:
+    with tempfile.TemporaryDirectory(prefix="latex-") as workdir:
+        returncode, log = _run_pdflatex(source, jobname, workdir, timeout, args, env)
+        _write_log(log_path, log)
+        if returncode is None:
+            raise LatexError(f"pdflatex timed out after {timeout}s", log)
+
+        pdf_path = os.path.join(workdir, f"{jobname}.pdf")
+        if returncode != 0 or not os.path.exists(pdf_path):
+            raise LatexError(f"pdflatex failed with exit code {returncode}", log)
+        with open(pdf_path, "rb") as pdf_file:
+            return pdf_file.read()
+
+def compile_latex(tex: str, jobname: str = "poster", timeout: float = DEFAULT_TIMEOUT, log_path: str = None,
+                  use_cache: bool = True) -> bytes:
+    """
+    Compile a LaTeX document to PDF bytes. The .tex source and pdflatex's aux, log and
+    PDF files live in a temporary directory private to this job, so concurrent jobs never
+    clash; relative \\includegraphics paths still resolve against the working directory.
+
+    pdflatex runs non-interactively with shell escape off and writes restricted to its
+    own directory, under a timeout, and at most MAX_CONCURRENT at a time. Documents whose
+    preamble is common enough compile against a precompiled format (see FormatCache).
+    Failures raise LatexError carrying the log; log_path, if given, receives the log either way.
+
+    Before any of that the source goes through validate_latex, so a malformed document
+    fails in milliseconds. With use_cache, PDFs are kept by compile_key: a document whose
+    source and images are unchanged is never compiled twice, and one that failed to
+    compile fails again straight away.
+    """
+    problems = validate_latex(tex, jobname)
+    if problems:
+        _write_log(log_path, "\n".join(problems))
+        logging.error(f"LaTeX errors for {jobname}: {problems[:5]}")
+        raise LatexError(f"LaTeX source failed validation with {len(problems)} problem(s)", "\n".join(problems))
+    if not use_cache:
+        return _compile_document(tex, jobname, timeout, log_path)
+
+    key = compile_key(tex)
+    cache = get_pdf_cache()
+    pdf = cache.get(key)
+    if pdf is not None:
+        logging.info(f"Reused cached LaTeX PDF for {jobname}")
+        return pdf
+    with _failures_lock:
+        failure = _failures.get(key)
+    if failure:
+        _write_log(log_path, failure[1])
+        raise LatexError(*failure)
+    try:
+        return _compile_document(tex, jobname, timeout, log_path, cache, key)
+    except LatexError as e:
+        # Timeouts depend on load, not on the document, so only remember real failures
+        if not str(e).startswith("pdflatex timed out"):
+            with _failures_lock:
+                _failures[key] = (str(e), e.log)
+                while len(_failures) > MAX_REMEMBERED_FAILURES:
+                    _failures.pop(next(iter(_failures)))
+        raise
+
+def _compile_document(tex: str, jobname: str, timeout: float, log_path: str,
+                      cache: render_cache.RenderCache = None, key: str = None) -> bytes:
+    with _slots:
+        if cache is not None:
+            # An identical document may have finished compiling while we waited for a slot
+            pdf = cache.get(key)
+            if pdf is not None:
+                return pdf
+        pdf = _compile_with_format(tex, jobname, timeout, log_path)
+        if cache is not None:
+            cache.put(key, pdf)
+        return pdf
+
+def _compile_with_format(tex: str, jobname: str, timeout: float, log_path: str) -> bytes:
+    preamble, body = split_preamble(tex)
+    formats = get_format_cache() if preamble is not None and USE_FORMATS else None
+    format_name = formats.format_for(preamble, timeout) if formats else None
+
+    if format_name:
+        start = time.perf_counter()
+        try:
+            pdf = _compile(body, jobname, timeout, log_path, [f"-fmt={format_name}"], formats.env())
+            formats.record(preamble, time.perf_counter() - start, with_format=True)
+            return pdf
+        except LatexError as e:
+            logging.warning(f"Compiling against LaTeX format {format_name} failed ({e}); compiling in full")
+
+    start = time.perf_counter()
+    try:
+        pdf = _compile(tex, jobname, timeout, log_path)
+    except LatexError as e:
+        logging.error(f"LaTeX errors for {jobname}: {e.errors()[:5]}")
+        raise
+    if formats:
+        formats.record(preamble, time.perf_counter() - start, with_format=False)
+    if format_name:
+        # The document itself is fine, so the format was at fault
+        formats.invalidate(preamble)
+    return pdf
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def submit(tex: str, jobname: str = "poster", timeout: float = DEFAULT_TIMEOUT, log_path: str = None,
+           use_cache: bool = True) -> Future:
+    """Compile in the background; the Future resolves to PDF bytes or raises LatexError."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT, thread_name_prefix="latex")
+    return _executor.submit(compile_latex, tex, jobname, timeout, log_path, use_cache)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    json.dump(get_format_cache().report(), sys.stdout, indent=2)
\ No newline at end of file
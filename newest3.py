@@ -1,6 +1,5 @@
 import os
 import openai
-import requests
 import logging
 from dotenv import load_dotenv
 from reportlab.lib.pagesizes import letter
@@ -11,8 +10,11 @@ from reportlab.lib.units import inch
 import asyncio
 from PyPDF2 import PdfReader
 import re
+import image_library
+import render_pool
+import preview
 import weasyprint
-from weasyprint import HTML
+import keyword_extraction
 
 # Load environment variables
 load_dotenv()
@@ -72,8 +74,14 @@ def load_templates_and_ads(template_dir: str) -> dict:
 
 def extract_keywords(club_info: dict) -> list:
     """
-    Use GPT to extract relevant keywords from the club info for image search.
+    Extract relevant keywords from the club info for image search. A local extractor is
+    used when it is confident enough; otherwise GPT extracts them.
     """
+    local_keywords, confidence = keyword_extraction.extract_local_keywords(club_info)
+    if confidence >= keyword_extraction.MIN_CONFIDENCE or not keyword_extraction.LLM_FALLBACK:
+        logging.info(f"Using locally extracted keywords (confidence {confidence:.2f})")
+        return local_keywords
+
     prompt = f"""
     Analyze the following club information and extract 5-10 keywords that describe the club visually:
     Name: {club_info.get('name', 'N/A')}
@@ -96,33 +104,18 @@ def extract_keywords(club_info: dict) -> list:
         return keywords
     except Exception as e:
         logging.error(f"Error extracting keywords: {e}")
-        return []
+        return local_keywords
 
-def search_unsplash(keywords: list, output_folder: str) -> str:
+def search_unsplash(keywords: list, output_folder: str, color_scheme: str = None) -> str:
     """
-    Search Unsplash for images based on keywords and save the first image to the output folder.
+    Search Unsplash for images based on keywords and return a locally stored image.
+    Local library images, and keywords and photos seen before, are served without any network access.
     """
-    base_url = "https://api.unsplash.com/search/photos"
-    headers = {"Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"}
-
     os.makedirs(output_folder, exist_ok=True)
     selected_image = None
 
     try:
-        for keyword in keywords:
-            params = {"query": keyword, "per_page": 1}
-            response = requests.get(base_url, headers=headers, params=params)
-            if response.status_code == 200:
-                results = response.json()["results"]
-                if results:
-                    image_url = results[0]["urls"]["regular"]
-                    image_data = requests.get(image_url).content
-                    selected_image = os.path.join(output_folder, f"{keyword}.jpg")
-                    with open(selected_image, 'wb') as img_file:
-                        img_file.write(image_data)
-                    break
-            else:
-                logging.error(f"Unsplash API error for keyword '{keyword}': {response.status_code}")
+        selected_image = image_library.find_image(keywords, output_folder, color_scheme)
     except Exception as e:
         logging.error(f"Error searching Unsplash: {e}")
 
@@ -273,88 +266,6 @@ def generate_content(club_info: dict, document_type: str, templates: dict, image
         logging.error(f"Error generating content: {e}")
         raise
 
-def html_center(html: str):
-    prompt = f"""
-        You are a graphic designer tasked with making sure that posters are always properly fitting the 8.5 in by 11 in page that they are on. To do so, you must make sure the html for the poster is set up to make the poster fill out the full page in both width and height. Below is some code to use in accomplishing this goal:
-
-        <!DOCTYPE html>
-            <html lang="en">
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>Perfect Scaling</title>
-                <style>
-                    body {{
-                        margin: 0;
-                        padding: 0;
-                        display: flex;
-                        justify-content: center;
-                        align-items: center;
-                        height: 100vh;
-                        background-color: #f0f0f0;
-                    }}
-
-                    .page {{
-                        width: 8.5in;
-                        height: 11in;
-                        background: white;
-                        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-                        overflow: hidden;
-                        position: relative;
-                    }}
-
-                    .content {{
-                        padding: 1in;
-                        box-sizing: border-box;
-                    }}
-                </style>
-            </head>
-            <body>
-                <div class="page" id="page">
-                    <div class="content">
-                        <h1>Your Content Here</h1>
-                        <p>Add more content to test perfect scaling for both height and width.</p>
-                        <p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>
-                        <p>Ut ac quam id nunc placerat fringilla ut id eros.</p>
-                    </div>
-                </div>
-
-                <script>
-                    window.onload = function() {{
-                        var page = document.getElementById('page');
-                        var content = page.querySelector('.content');
-                        
-                        // Get dimensions of the page and content
-                        var pageWidth = page.offsetWidth;
-                        var pageHeight = page.offsetHeight;
-                        var contentWidth = content.scrollWidth;
-                        var contentHeight = content.scrollHeight;
-
-                        // Calculate scale factors for both width and height
-                        var widthScale = pageWidth / contentWidth;
-                        var heightScale = pageHeight / contentHeight;
-
-                        // Use the smaller scale to ensure the content fits within both dimensions
-                        var scale = Math.min(widthScale, heightScale);
-
-                        // Apply scaling
-                        content.style.transform = `scale(${{scale}})`;
-                        content.style.transformOrigin = 'top left';
-                    }}
-                </script>
-            </body>
-            </html>
-    """
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": "You are a professional document creator."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=3000
-    )
-    return
-
 def extract_pdf_content(file_path):
     """Extract text content from a PDF file."""
     try:
@@ -501,20 +412,23 @@ async def main():
     # Extract keywords and search for images
     logging.info("Extracting keywords and searching for images...")
     keywords = extract_keywords(club_info)
-    selected_image = search_unsplash(keywords, image_folder)
+    selected_image = search_unsplash(keywords, image_folder, club_info.get("color scheme"))
 
     # Generate HTML content and create HTML-based PDFs
     logging.info("Generating HTML content...")
     html_versions = generate_content(club_info, "poster", assets["templates"], image_folder, selected_image)
 
-    # Iterate over the versions and save them as separate PDFs
-    for i, html_content in enumerate(html_versions):
+    # Render all versions concurrently on the warm worker pool, with a thumbnail of each for review
+    previews = [preview.preview_path(output_pdf) for output_pdf in html_output_pdfs]
+    renders = [render_pool.get_pool().submit(html_content, fit_page=True,
+                                             preview=previews[i] if i < len(previews) else None)
+               for i, html_content in enumerate(html_versions)]
+    for i, pending in enumerate(renders):
         try:
             output_pdf = html_output_pdfs[i]
-            adjusted_output_pdf = html_center(output_pdf)
             logging.info(f"Creating HTML-based PDF {i + 1}...")
-            # HTML(string=html_content).write_pdf(output_pdf)
-            HTML(string=html_content).write_pdf(adjusted_output_pdf)
+            with open(output_pdf, 'wb') as pdf_file:
+                pdf_file.write(pending.result())
         except IndexError:
             logging.error(f"Not enough output filenames provided for HTML versions. Skipping version {i + 1}.")
         except Exception as e:
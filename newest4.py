@@ -10,7 +10,8 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 import asyncio
 from PyPDF2 import PdfReader
-from weasyprint import HTML
+import keyword_extraction
+import render_pool
 
 # Load environment variables
 load_dotenv()
@@ -62,8 +63,14 @@ def load_templates_and_ads(template_dir: str) -> dict:
 
 def extract_keywords(club_info: dict) -> list:
     """
-    Use GPT to extract relevant keywords from the club info for image search.
+    Extract relevant keywords from the club info for image search. A local extractor is
+    used when it is confident enough; otherwise GPT extracts them.
     """
+    local_keywords, confidence = keyword_extraction.extract_local_keywords(club_info)
+    if confidence >= keyword_extraction.MIN_CONFIDENCE or not keyword_extraction.LLM_FALLBACK:
+        logging.info(f"Using locally extracted keywords (confidence {confidence:.2f})")
+        return local_keywords
+
     prompt = f"""
     Analyze the following club information and extract 5-10 keywords that describe the club visually:
     Name: {club_info.get('name', 'N/A')}
@@ -86,7 +93,7 @@ def extract_keywords(club_info: dict) -> list:
         return keywords
     except Exception as e:
         logging.error(f"Error extracting keywords: {e}")
-        return []
+        return local_keywords
 
 def search_unsplash(keywords: list) -> str:
     """
@@ -219,11 +226,14 @@ async def main():
     logging.info("Generating HTML content...")
     html_versions = generate_content(club_info, "poster", assets["templates"], image_url)
 
-    for i, html_content in enumerate(html_versions):
+    # Render all versions concurrently on the warm worker pool
+    renders = [render_pool.get_pool().submit(html_content) for html_content in html_versions]
+    for i, render in enumerate(renders):
         try:
             output_pdf = html_output_pdfs[i]
             logging.info(f"Creating HTML-based PDF {i + 1}...")
-            HTML(string=html_content).write_pdf(output_pdf)
+            with open(output_pdf, 'wb') as pdf_file:
+                pdf_file.write(render.result())
         except IndexError:
             logging.error(f"Not enough output filenames provided for HTML versions. Skipping version {i + 1}.")
         except Exception as e:
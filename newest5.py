@@ -1,6 +1,5 @@
 import os
 import openai
-import requests
 import logging
 from dotenv import load_dotenv
 from reportlab.lib.pagesizes import letter
@@ -10,7 +9,12 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 import asyncio
 from PyPDF2 import PdfReader
-from weasyprint import HTML
+import unsplash
+import image_library
+from pathlib import Path
+import keyword_extraction
+import render_pool
+import preview
 
 # Load environment variables
 load_dotenv()
@@ -62,8 +66,14 @@ def load_templates_and_ads(template_dir: str) -> dict:
 
 def extract_keywords(club_info: dict) -> list:
     """
-    Use GPT to extract relevant keywords from the club info for image search.
+    Extract relevant keywords from the club info for image search. A local extractor is
+    used when it is confident enough; otherwise GPT extracts them.
     """
+    local_keywords, confidence = keyword_extraction.extract_local_keywords(club_info)
+    if confidence >= keyword_extraction.MIN_CONFIDENCE or not keyword_extraction.LLM_FALLBACK:
+        logging.info(f"Using locally extracted keywords (confidence {confidence:.2f})")
+        return local_keywords
+
     prompt = f"""
     Analyze the following club information and extract 5-10 keywords that describe the club visually:
     Name: {club_info.get('name', 'N/A')}
@@ -86,25 +96,20 @@ def extract_keywords(club_info: dict) -> list:
         return keywords
     except Exception as e:
         logging.error(f"Error extracting keywords: {e}")
-        return []
+        return local_keywords
 
 def search_unsplash(keywords: list) -> str:
     """
     Search Unsplash for an image URL based on keywords.
     """
-    base_url = "https://api.unsplash.com/search/photos"
-    headers = {"Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"}
-
     try:
-        for keyword in keywords:
-            params = {"query": keyword, "per_page": 1}
-            response = requests.get(base_url, headers=headers, params=params)
-            if response.status_code == 200:
-                results = response.json().get("results", [])
-                if results:
-                    return results[0]["urls"]["regular"]  # Return the first image URL
-            else:
-                logging.error(f"Unsplash API error for keyword '{keyword}': {response.status_code}")
+        matches = image_library.get_library().query(keywords, limit=1)
+        if matches:
+            return Path(matches[0][0]).resolve().as_uri()  # Local library image, no network needed
+        results = unsplash.search_keywords(keywords, per_page=1, max_images=1)
+        if results:
+            # Smallest variant that prints sharply at half-page width
+            return unsplash.select_variant_url(results[0], slot="half")
     except Exception as e:
         logging.error(f"Error searching Unsplash: {e}")
 
@@ -320,11 +325,16 @@ async def main():
     logging.info("Generating HTML content...")
     html_versions = generate_content(club_info, "poster", assets["templates"], image_url)
 
-    for i, html_content in enumerate(html_versions):
+    # Render all versions concurrently on the warm worker pool, with a thumbnail of each for review
+    previews = [preview.preview_path(output_pdf) for output_pdf in html_output_pdfs]
+    renders = [render_pool.get_pool().submit(html_content, preview=previews[i] if i < len(previews) else None)
+               for i, html_content in enumerate(html_versions)]
+    for i, render in enumerate(renders):
         try:
             output_pdf = html_output_pdfs[i]
             logging.info(f"Creating HTML-based PDF {i + 1}...")
-            HTML(string=html_content).write_pdf(output_pdf)
+            with open(output_pdf, 'wb') as pdf_file:
+                pdf_file.write(render.result())
         except IndexError:
             logging.error(f"Not enough output filenames provided for HTML versions. Skipping version {i + 1}.")
         except Exception as e:
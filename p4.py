@@ -1,7 +1,7 @@
 import os
 import openai
-from weasyprint import HTML, CSS
-from weasyprint.fonts import FontConfiguration
+from weasyprint import HTML
+import stylesheets
 import logging
 from dotenv import load_dotenv
 
@@ -73,7 +73,7 @@ def generate_content(club_info: dict, document_type: str) -> str:
 
 def create_pdf(content: str, filename: str):
     """Create a PDF from the HTML content using WeasyPrint."""
-    css = CSS(string=f"""
+    css = stylesheets.get_stylesheet(f"""
         @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@400;700&family=Montserrat:wght@400;700&display=swap');
         @page {{
             size: letter;
@@ -136,7 +136,7 @@ def create_pdf(content: str, filename: str):
     """)
 
     try:
-        HTML(string=content).write_pdf(filename, stylesheets=[css])
+        HTML(string=content).write_pdf(filename, stylesheets=[css], font_config=stylesheets.get_font_config())
         logging.info(f"PDF created successfully: {filename}")
     except Exception as e:
         logging.error(f"Error creating PDF: {str(e)}")
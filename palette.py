@@ -0,0 +1,128 @@
+import re
+import numpy as np
+from PIL import Image
+
+THUMBNAIL_SIZE = (64, 64)
+
+# Reference RGB values for the color words that show up in club "Color Scheme" fields
+COLOR_NAMES = {
+    "red": (200, 30, 40), "crimson": (220, 20, 60), "maroon": (128, 0, 32), "burgundy": (128, 0, 32),
+    "orange": (240, 130, 30), "amber": (255, 191, 0), "yellow": (245, 210, 50), "gold": (212, 175, 55),
+    "golden": (212, 175, 55), "green": (50, 150, 60), "olive": (128, 128, 0), "lime": (160, 210, 60),
+    "teal": (0, 128, 128), "turquoise": (64, 200, 200), "cyan": (0, 200, 220), "blue": (40, 90, 200),
+    "navy": (20, 30, 90), "indigo": (75, 0, 130), "purple": (120, 50, 160), "violet": (140, 80, 200),
+    "lavender": (200, 180, 230), "pink": (240, 140, 170), "magenta": (210, 40, 160), "brown": (120, 75, 40),
+    "chocolate": (90, 50, 25), "tan": (210, 180, 140), "beige": (225, 210, 180), "cream": (250, 240, 215),
+    "ivory": (255, 255, 240), "white": (250, 250, 250), "black": (15, 15, 15), "gray": (128, 128, 128),
+    "grey": (128, 128, 128), "silver": (192, 192, 192), "coral": (255, 127, 80), "peach": (255, 200, 160),
+    "mint": (170, 230, 200), "sage": (160, 180, 140), "terracotta": (205, 100, 70), "rust": (180, 70, 30),
+}
+LIGHTER = {"light", "pale", "pastel", "soft"}
+DARKER = {"dark", "deep", "rich"}
+
+def _thumbnail_pixels(image: Image.Image) -> np.ndarray:
+    thumb = image.convert("RGB")
+    thumb.thumbnail(THUMBNAIL_SIZE)
+    return np.asarray(thumb, dtype=np.float64).reshape(-1, 3)
+
+def kmeans(pixels: np.ndarray, k: int, iterations: int = 15, seed: int = 0) -> tuple:
+    """Vectorized k-means with k-means++ seeding. Returns (centers, weights), heaviest first."""
+    rng = np.random.default_rng(seed)
+    centers = pixels[rng.integers(len(pixels))][None, :]
+    for _ in range(1, k):
+        nearest = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(-1).min(axis=1)
+        if nearest.sum() == 0:
+            break
+        centers = np.vstack([centers, pixels[rng.choice(len(pixels), p=nearest / nearest.sum())]])
+
+    for _ in range(iterations):
+        labels = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(-1).argmin(axis=1)
+        counts = np.bincount(labels, minlength=len(centers))
+        sums = np.stack([np.bincount(labels, weights=pixels[:, c], minlength=len(centers)) for c in range(3)], axis=1)
+        updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        converged = np.abs(updated - centers).max() < 0.5
+        centers = updated
+        if converged:
+            break
+
+    labels = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(-1).argmin(axis=1)
+    weights = np.bincount(labels, minlength=len(centers)) / len(pixels)
+    order = np.argsort(-weights)
+    return centers[order], weights[order]
+
+def extract_palette(image, count: int = 5) -> list:
+    """Return the dominant colors of an image (PIL image or path) as (hex, weight) pairs, heaviest first."""
+    if not isinstance(image, Image.Image):
+        with Image.open(image) as opened:
+            pixels = _thumbnail_pixels(opened)
+    else:
+        pixels = _thumbnail_pixels(image)
+    centers, weights = kmeans(pixels, count)
+    return [("#{:02x}{:02x}{:02x}".format(*np.clip(np.rint(center), 0, 255).astype(int)), round(float(weight), 4))
+            for center, weight in zip(centers, weights) if weight > 0]
+
+def hex_to_rgb(color: str) -> tuple:
+    color = color.lstrip("#")
+    if len(color) == 3:
+        color = "".join(ch * 2 for ch in color)
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+def parse_color_scheme(text: str) -> list:
+    """
+    Turn a free-text color scheme such as "Warm tones of orange and red with cream accents"
+    into a list of RGB tuples. Hex codes are used as-is; "light"/"dark" modifiers adjust the
+    following color word.
+    """
+    if not text:
+        return []
+    colors = [hex_to_rgb(match) for match in re.findall(r"#(?:[0-9a-fA-F]{6}|[0-9a-fA-F]{3})\b", text)]
+    words = re.findall(r"[a-z]+", text.lower())
+    for i, word in enumerate(words):
+        if word not in COLOR_NAMES:
+            continue
+        rgb = np.array(COLOR_NAMES[word], dtype=np.float64)
+        if i > 0 and words[i - 1] in LIGHTER:
+            rgb = rgb + (255 - rgb) * 0.4
+        elif i > 0 and words[i - 1] in DARKER:
+            rgb = rgb * 0.6
+        colors.append(tuple(int(round(value)) for value in rgb))
+    return colors
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """Convert an (N, 3) array of sRGB values in 0-255 to CIELAB (D65)."""
+    srgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(srgb > 0.04045, ((srgb + 0.055) / 1.055) ** 2.4, srgb / 12.92)
+    xyz = linear @ np.array([[0.4124, 0.3576, 0.1805],
+                             [0.2126, 0.7152, 0.0722],
+                             [0.0193, 0.1192, 0.9505]]).T
+    xyz = xyz / np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16 / 116)
+    return np.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1)
+
+def scheme_distance(colors: list, scheme: list, weights: list = None) -> float:
+    """
+    Distance between an image palette (hex strings) and a parsed color scheme (RGB tuples), in
+    CIELAB units. It averages how far the image's colors sit from the scheme and how well the
+    image covers each scheme color. Lower is a better match.
+    """
+    if not colors or not scheme:
+        return float("inf")
+    weights = np.asarray(weights if weights else [1.0] * len(colors), dtype=np.float64)
+    weights = weights / weights.sum()
+    palette_lab = rgb_to_lab(np.array([hex_to_rgb(color) for color in colors]))
+    scheme_lab = rgb_to_lab(np.array(scheme))
+    distances = np.sqrt(((palette_lab[:, None, :] - scheme_lab[None, :, :]) ** 2).sum(-1))
+    on_scheme = float((weights * distances.min(axis=1)).sum())
+    coverage = float(distances.min(axis=0).mean())
+    return (on_scheme + coverage) / 2
+
+def rank_by_scheme(candidates: list, scheme_text: str) -> list:
+    """
+    Sort candidate metadata dicts carrying "dominant_colors" (and optionally "color_weights")
+    by how well they match a color scheme, best first. Order is unchanged if no colors parse.
+    """
+    scheme = parse_color_scheme(scheme_text)
+    if not scheme:
+        return list(candidates)
+    return sorted(candidates, key=lambda meta: scheme_distance(meta.get("dominant_colors"), scheme,
+                                                               meta.get("color_weights")))
\ No newline at end of file
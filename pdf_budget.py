@@ -0,0 +1,127 @@
+import io
+import os
+import sys
+import logging
+try:
+    import pikepdf
+except ImportError:  # stream recompression is skipped without it
+    pikepdf = None
+
+MAX_PDF_BYTES = int(float(os.getenv("PDF_MAX_MB", 3)) * 1024 * 1024)
+
+# (jpeg_quality, dpi) steps tried in order until a PDF fits its budget; None keeps WeasyPrint's default
+QUALITY_LADDER = [(None, None), (85, 300), (75, 200), (65, 150), (50, 110), (40, 80)]
+
+def recompress(pdf: bytes) -> bytes:
+    """
+    Losslessly recompress a PDF's streams (Flate at maximum effort, object streams) in
+    memory. Returns the input unchanged if pikepdf is not installed or it gets no smaller.
+    """
+    if pikepdf is None:
+        return pdf
+    try:
+        with pikepdf.open(io.BytesIO(pdf)) as document:
+            output = io.BytesIO()
+            document.save(output, compress_streams=True, recompress_flate=True,
+                          object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    except Exception as e:
+        logging.error(f"Error recompressing PDF: {e}")
+        return pdf
+    return min(pdf, output.getvalue(), key=len)
+
+def write_within_budget(document, zoom: float = 1.0, max_bytes: int = MAX_PDF_BYTES, render=None,
+                        **options) -> bytes:
+    """
+    Serialize a laid-out WeasyPrint document to PDF bytes no larger than max_bytes.
+
+    WeasyPrint already embeds subsetted fonts, and the document is written once with its
+    streams recompressed. WeasyPrint only applies jpeg_quality, dpi and optimize_images
+    while laying out, so while that PDF is over budget its images are re-encoded down
+    QUALITY_LADDER in memory (shrink_pdf, with pikepdf). Without pikepdf, render (called
+    with those image options, returning a new Document) lays the poster out again per step.
+    If even the last step is too big, the smallest PDF is returned.
+    """
+    pdf = recompress(document.write_pdf(zoom=zoom, **options))
+    if not max_bytes or len(pdf) <= max_bytes:
+        return pdf
+
+    if pikepdf is not None:
+        smallest = min(pdf, shrink_pdf(pdf, max_bytes), key=len)
+    elif render is not None:
+        smallest = pdf
+        for quality, dpi in QUALITY_LADDER:
+            if quality is None or len(smallest) <= max_bytes:
+                continue
+            attempt = render(optimize_images=True, jpeg_quality=quality, dpi=dpi).write_pdf(zoom=zoom, **options)
+            smallest = min(smallest, recompress(attempt), key=len)
+    else:
+        logging.warning("Cannot shrink an over-budget PDF without pikepdf.")
+        smallest = pdf
+
+    if len(smallest) <= max_bytes:
+        logging.info(f"PDF shrunk from {len(pdf) // 1024} KB to {len(smallest) // 1024} KB to fit its budget")
+    else:
+        logging.warning(f"PDF is {len(smallest) // 1024} KB, over the {max_bytes // 1024} KB budget at the lowest quality")
+    return smallest
+
+def shrink_images(pdf: bytes, quality: int, max_dimension: int) -> bytes:
+    """
+    Re-encode the opaque raster images of an existing PDF as JPEGs at the given quality,
+    downscaled to at most max_dimension pixels, in memory. Needs pikepdf.
+    """
+    from PIL import Image
+
+    with pikepdf.open(io.BytesIO(pdf)) as document:
+        for page in document.pages:
+            # WeasyPrint draws through form XObjects, which get_images (pikepdf >= 10) looks into
+            images = page.get_images() if hasattr(page, "get_images") else page.images
+            for _, image in images.items():
+                if "/SMask" in image or image.get("/ImageMask", False):
+                    continue
+                try:
+                    picture = pikepdf.PdfImage(image).as_pil_image().convert("RGB")
+                except Exception:
+                    continue
+                picture.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+                encoded = io.BytesIO()
+                picture.save(encoded, "JPEG", quality=quality, optimize=True, progressive=True)
+                if len(encoded.getvalue()) >= len(image.read_raw_bytes()):
+                    continue
+                image.write(encoded.getvalue(), filter=pikepdf.Name.DCTDecode)
+                image.Width, image.Height = picture.size
+                image.ColorSpace = pikepdf.Name.DeviceRGB
+                image.BitsPerComponent = 8
+                for key in ("/DecodeParms", "/Decode"):
+                    if key in image:
+                        del image[key]
+        output = io.BytesIO()
+        document.save(output, compress_streams=True, recompress_flate=True,
+                      object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    return output.getvalue()
+
+def shrink_pdf(pdf: bytes, max_bytes: int = MAX_PDF_BYTES) -> bytes:
+    """Bring an already written PDF under max_bytes, using the same quality ladder as renders."""
+    if pikepdf is None:
+        raise RuntimeError("Shrinking existing PDFs needs pikepdf.")
+    smallest = recompress(pdf)
+    for quality, dpi in QUALITY_LADDER:
+        if len(smallest) <= max_bytes:
+            break
+        if quality is None:
+            continue
+        # A letter page at this dpi is 11 in on its long side
+        candidate = shrink_images(smallest, quality, int(11 * dpi))
+        if len(candidate) < len(smallest):
+            smallest = candidate
+    return smallest
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    for path in sys.argv[1:]:
+        with open(path, 'rb') as pdf_file:
+            original = pdf_file.read()
+        shrunk = shrink_pdf(original)
+        if len(shrunk) < len(original):
+            with open(path, 'wb') as pdf_file:
+                pdf_file.write(shrunk)
+        logging.info(f"{path}: {len(original) // 1024} KB -> {min(len(original), len(shrunk)) // 1024} KB")
\ No newline at end of file
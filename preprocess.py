@@ -0,0 +1,124 @@
+import os
+import re
+import hashlib
+import logging
+from pathlib import Path
+from urllib.parse import urlparse, unquote
+from PIL import Image, ImageOps
+import unsplash
+
+DERIVED_DIR = os.path.join("cache", "derived")
+DEFAULT_DPI = 150
+JPEG_QUALITY = 80
+
+IMG_TAG_PATTERN = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+SRC_ATTRIBUTE_PATTERN = re.compile(r"""((?<![\w-])src\s*=\s*)(["'])([^"']+)\2""", re.IGNORECASE)
+SLOT_ATTRIBUTE_PATTERN = re.compile(r"""\bdata-slot\s*=\s*["']?([\w-]+)""", re.IGNORECASE)
+CLASS_ATTRIBUTE_PATTERN = re.compile(r"""(?<![\w-])class\s*=\s*(["'])(.*?)\1""", re.IGNORECASE | re.DOTALL)
+CSS_URL_PATTERN = re.compile(r"""url\(\s*(["']?)([^"')]+)\1\s*\)""", re.IGNORECASE)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff')
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def preprocess_image(path: str, slot: str = "hero", dpi: int = DEFAULT_DPI, quality: int = JPEG_QUALITY,
+                     output_dir: str = DERIVED_DIR) -> str:
+    """
+    Produce a print-ready copy of an image sized for its slot at the given DPI.
+
+    The image is downscaled to cover the slot (never upscaled), EXIF orientation is applied
+    and all metadata is dropped, and it is re-encoded as a progressive JPEG (or optimized PNG
+    when it has transparency). Derived files are cached by source content and parameters.
+    """
+    slot_width_in, slot_height_in = unsplash.IMAGE_SLOTS[slot]
+    key = hashlib.sha256(f"{file_digest(path)}|{slot}|{dpi}|{quality}".encode("utf-8")).hexdigest()[:24]
+
+    os.makedirs(output_dir, exist_ok=True)
+    for ext in ('.jpg', '.png'):
+        cached = os.path.join(output_dir, key + ext)
+        if os.path.exists(cached):
+            return cached
+
+    with Image.open(path) as source:
+        image = ImageOps.exif_transpose(source)
+        scale = min(1.0, max(slot_width_in * dpi / image.width, slot_height_in * dpi / image.height))
+        if scale < 1.0:
+            image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                                 Image.LANCZOS)
+
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image.info = {}
+        if has_alpha:
+            derived = os.path.join(output_dir, key + ".png")
+            image.save(derived + ".tmp", "PNG", optimize=True)
+        else:
+            derived = os.path.join(output_dir, key + ".jpg")
+            image.convert("RGB").save(derived + ".tmp", "JPEG", quality=quality, optimize=True, progressive=True)
+    os.replace(derived + ".tmp", derived)
+
+    logging.info(f"Preprocessed {path} ({os.path.getsize(path)} bytes) -> {derived} ({os.path.getsize(derived)} bytes)")
+    return derived
+
+def _local_path(src: str, base_dir: str) -> str:
+    """Resolve an HTML/CSS image reference to a local file, or None if it is remote or missing."""
+    parsed = urlparse(src)
+    if parsed.scheme == "file":
+        path = unquote(parsed.path)
+    elif parsed.scheme and len(parsed.scheme) > 1:
+        return None
+    else:
+        path = os.path.join(base_dir, unquote(src))
+    if path.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(path):
+        return path
+    return None
+
+def image_slot(tag: str, default: str = "hero") -> str:
+    """
+    The slot an <img> tag is printed in: from data-slot="half", or else a class named after
+    a slot ("full-page", "slot-inset", ...), or else default.
+    """
+    candidates = []
+    slot_attribute = SLOT_ATTRIBUTE_PATTERN.search(tag)
+    if slot_attribute:
+        candidates.append(slot_attribute.group(1))
+    class_attribute = CLASS_ATTRIBUTE_PATTERN.search(tag)
+    if class_attribute:
+        candidates.extend(class_attribute.group(2).split())
+    for candidate in candidates:
+        name = candidate.lower().replace("-", "_")
+        name = name[len("slot_"):] if name.startswith("slot_") else name
+        if name in unsplash.IMAGE_SLOTS:
+            return name
+    return default
+
+def preprocess_html_images(html: str, base_dir: str = ".", slot: str = "hero", dpi: int = DEFAULT_DPI,
+                           quality: int = JPEG_QUALITY, background_slot: str = "full_page") -> str:
+    """
+    Replace local image references in <img src> and CSS url() with preprocessed copies.
+    Each <img> is sized for the slot image_slot finds on it (slot when it names none), and
+    CSS url() images, which are backgrounds, for background_slot. Remote URLs and
+    references to files that do not exist are left untouched.
+    """
+    def replace(src: str, image_slot_name: str) -> str:
+        path = _local_path(src, base_dir)
+        if not path:
+            return src
+        try:
+            return Path(preprocess_image(path, image_slot_name, dpi, quality)).resolve().as_uri()
+        except Exception as e:
+            logging.error(f"Error preprocessing image {path}: {e}")
+            return src
+
+    def replace_tag(match):
+        tag = match.group(0)
+        tag_slot = image_slot(tag, slot)
+        return SRC_ATTRIBUTE_PATTERN.sub(
+            lambda m: f"{m.group(1)}{m.group(2)}{replace(m.group(3), tag_slot)}{m.group(2)}", tag, count=1)
+
+    html = IMG_TAG_PATTERN.sub(replace_tag, html)
+    return CSS_URL_PATTERN.sub(lambda m: f"url({m.group(1)}{replace(m.group(2), background_slot)}{m.group(1)})", html)
\ No newline at end of file
@@ -0,0 +1,65 @@
+import io
+import os
+import shutil
+import logging
+import subprocess
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # fall back to poppler's pdftoppm
+    pdfium = None
+
+PREVIEW_DPI = int(os.getenv("PREVIEW_DPI", 36))
+PREVIEW_FORMATS = {"png": "PNG", "jpeg": "JPEG", "jpg": "JPEG"}
+# Set once the missing-rasterizer warning has been logged
+_rasterizer_warned = False
+
+def preview_path(pdf_path: str, fmt: str = "png") -> str:
+    """Where the preview of a PDF goes: next to it, with the image extension."""
+    return os.path.splitext(pdf_path)[0] + f".{fmt}"
+
+def rasterize(pdf: bytes, dpi: int = PREVIEW_DPI, fmt: str = "png", quality: int = 70) -> bytes:
+    """
+    Rasterize the first page of a PDF into a low-resolution PNG or JPEG thumbnail.
+    Uses pypdfium2 when it is installed and poppler's pdftoppm otherwise.
+    """
+    if fmt not in PREVIEW_FORMATS:
+        raise ValueError(f"Unsupported preview format: {fmt}")
+
+    if pdfium is not None:
+        document = pdfium.PdfDocument(pdf)
+        try:
+            image = document[0].render(scale=dpi / 72).to_pil()
+        finally:
+            document.close()
+        buffer = io.BytesIO()
+        if PREVIEW_FORMATS[fmt] == "JPEG":
+            image.convert("RGB").save(buffer, "JPEG", quality=quality, optimize=True)
+        else:
+            image.save(buffer, "PNG", optimize=True)
+        return buffer.getvalue()
+
+    if shutil.which("pdftoppm"):
+        format_flags = ["-jpeg", "-jpegopt", f"quality={quality}"] if PREVIEW_FORMATS[fmt] == "JPEG" else ["-png"]
+        result = subprocess.run(["pdftoppm", "-r", str(dpi), "-f", "1", "-l", "1", "-singlefile", *format_flags, "-"],
+                                input=pdf, capture_output=True, timeout=60, check=True)
+        return result.stdout
+
+    raise RuntimeError("No PDF rasterizer available; install pypdfium2 or poppler-utils.")
+
+def write_preview(pdf: bytes, path: str, dpi: int = PREVIEW_DPI) -> str:
+    """Write a thumbnail of a rendered PDF to path, choosing the format from its extension."""
+    global _rasterizer_warned
+    if pdfium is None and not shutil.which("pdftoppm"):
+        if not _rasterizer_warned:
+            _rasterizer_warned = True
+            logging.warning("No PDF rasterizer available, previews will not be written; install pypdfium2 or poppler-utils.")
+        return None
+    fmt = os.path.splitext(path)[1].lstrip(".").lower() or "png"
+    try:
+        image = rasterize(pdf, dpi, fmt)
+        with open(path, 'wb') as image_file:
+            image_file.write(image)
+        return path
+    except Exception as e:
+        logging.error(f"Error writing preview {path}: {e}")
+        return None
\ No newline at end of file
@@ -0,0 +1,124 @@
+import logging
+from weasyprint import HTML
+import preprocess
+import fonts
+import url_fetcher
+import stylesheets
+import render_cache
+import fit
+import preview as previews
+import structure
+import simplify
+import pdf_budget
+
+# write_pdf options that HTML.render() consumes (layout and image loading), not Document.write_pdf()
+LAYOUT_OPTIONS = ("presentational_hints", "optimize_images", "jpeg_quality", "dpi")
+
+def prepare_html(html: str, base_dir: str = ".") -> str:
+    """
+    Make generated HTML ready for WeasyPrint: local images are swapped for print-sized
+    copies and Google Fonts references for the local font bundle.
+    """
+    html = preprocess.preprocess_html_images(html, base_dir)
+    return fonts.localize_fonts(html)
+
+def make_html(html: str, base_url: str = None, base_dir: str = ".", prepared: bool = False) -> HTML:
+    """
+    Build a WeasyPrint HTML document from generated HTML, prepared for printing and
+    fetching remote resources through the shared caching url_fetcher.
+    """
+    if not prepared:
+        html = prepare_html(html, base_dir)
+    return HTML(string=html, base_url=base_url, url_fetcher=url_fetcher.get_fetcher())
+
+def render_document(html: str, css: list = None, base_url: str = None, fit_page: bool = False,
+                    prepared: bool = False, **layout_options) -> tuple:
+    """
+    Parse and lay out generated HTML once, returning the WeasyPrint Document and the zoom
+    to write it at (below 1 only when fit_page had to shrink the poster).
+    """
+    if not prepared:
+        html = prepare_html(html)
+    if fit_page:
+        return fit.fit_to_page(html, css, base_url, **layout_options)
+    sheets = [stylesheets.get_stylesheet(sheet) for sheet in css or []]
+    document = make_html(html, base_url, prepared=True).render(
+        stylesheets=sheets, font_config=stylesheets.get_font_config(), **layout_options)
+    return document, 1.0
+
+def render_outputs(html: str, formats: tuple = ("pdf",), css: list = None, base_url: str = None,
+                   fit_page: bool = False, dpi: int = previews.PREVIEW_DPI, **options) -> dict:
+    """
+    Lay out a poster once and serialize that one Document to every requested format:
+    "pdf" (bytes), "png"/"jpeg" (first-page raster bytes) and "json" (box structure, see
+    structure.document_structure). Rasters come from Document.write_png on WeasyPrint
+    versions that still have it and from the PDF of the same layout otherwise.
+    """
+    layout_options = {name: options.pop(name) for name in LAYOUT_OPTIONS if name in options}
+    document, scale = render_document(html, css, base_url, fit_page, **layout_options)
+
+    legacy_png = hasattr(document, "write_png")  # WeasyPrint < 53
+    needs_pdf = "pdf" in formats or "jpeg" in formats or ("png" in formats and not legacy_png)
+    pdf = document.write_pdf(zoom=scale, **options) if needs_pdf else None
+
+    outputs = {}
+    if "pdf" in formats:
+        outputs["pdf"] = pdf
+    if "png" in formats:
+        outputs["png"] = document.write_png(resolution=dpi * scale) if legacy_png else previews.rasterize(pdf, dpi, "png")
+    if "jpeg" in formats:
+        outputs["jpeg"] = previews.rasterize(pdf, dpi, "jpeg")
+    if "json" in formats:
+        outputs["json"] = structure.document_structure(document, scale)
+    return outputs
+
+def write_pdf(html: str, target: str = None, css: list = None, base_url: str = None, use_cache: bool = True,
+              fit_page: bool = False, preview: str = None, fast: bool = None,
+              max_bytes: int = pdf_budget.MAX_PDF_BYTES, **options) -> bytes:
+    """
+    Render generated HTML (plus optional CSS strings) to PDF bytes, optionally also writing
+    them to target. Identical renders are answered from the content-hash render cache.
+    With fit_page the poster is scaled to fit exactly one letter page (see fit.fit_to_page),
+    and with preview a low-resolution thumbnail of the same render is written to that path.
+    fast (default: the FAST_RENDER environment variable) applies simplify.fast_html/fast_css.
+    The PDF is kept under max_bytes (see pdf_budget.write_within_budget); 0 disables the budget.
+    """
+    if simplify.FAST_RENDER if fast is None else fast:
+        area = simplify.document_page_area(html, css)
+        html, counts = simplify.fast_html(html, area)
+        css = [simplify.fast_css(sheet, area)[0] for sheet in css or []]
+        logging.info(f"Fast render rewrites: {dict(counts)}")
+    html = prepare_html(html)
+    cache = render_cache.get_cache() if use_cache else None
+    # Stylesheets are keyed after font localization so bundled font files count as resources
+    key = render_cache.render_key(html, [fonts.localize_fonts(sheet) for sheet in css or []], base_url,
+                                  fit_page=fit_page, max_bytes=max_bytes, **options) if cache else None
+    pdf = cache.get(key) if cache else None
+
+    if pdf is not None:
+        logging.info(f"Render cache hit {key[:12]}")
+        return _write_target(pdf, target, preview)
+
+    # Laid out once; the size budget only re-serializes this document
+    layout_options = {name: options.pop(name) for name in LAYOUT_OPTIONS if name in options}
+    document, scale = render_document(html, css, base_url, fit_page, prepared=True, **layout_options)
+
+    def rerender(**image_options):
+        # The same layout at the same scale, only with the images encoded differently
+        attempt = {**layout_options, **image_options}
+        if fit_page:
+            return fit.layout(html, scale, css, base_url, **attempt)
+        return render_document(html, css, base_url, prepared=True, **attempt)[0]
+
+    pdf = pdf_budget.write_within_budget(document, scale, max_bytes, rerender, **options)
+    if cache:
+        cache.put(key, pdf)
+    return _write_target(pdf, target, preview)
+
+def _write_target(pdf: bytes, target: str = None, preview: str = None) -> bytes:
+    if target:
+        with open(target, 'wb') as pdf_file:
+            pdf_file.write(pdf)
+    if preview:
+        previews.write_preview(pdf, preview)
+    return pdf
\ No newline at end of file
@@ -0,0 +1,110 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from urllib.parse import urlparse, unquote
+import preprocess
+import cache_files
+
+RENDER_CACHE_DIR = os.path.join("cache", "renders")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+RESOURCE_PATTERN = re.compile(r"""(?:\b(?:src|href)\s*=\s*["']|url\(\s*["']?)(file://[^"')\s]+)""", re.IGNORECASE)
+
+def normalize_html(html: str) -> str:
+    """Normalize line endings and whitespace between tags, which generated posters never depend on."""
+    html = html.replace("\r\n", "\n").strip()
+    return re.sub(r">\s+<", "> <", html)
+
+def resource_digests(html: str) -> dict:
+    """
+    Content digests of the local files an HTML document references (preprocessed images,
+    bundled fonts), so editing one of them invalidates cached renders. Remote URLs are
+    keyed by the URL itself.
+    """
+    digests = {}
+    for url in sorted(set(RESOURCE_PATTERN.findall(html))):
+        path = unquote(urlparse(url).path)
+        try:
+            digests[url] = preprocess.file_digest(path)
+        except OSError:
+            digests[url] = None
+    return digests
+
+def render_key(html: str, css: list = None, base_url: str = None, **options) -> str:
+    """Hash of everything that determines a render's PDF bytes."""
+    normalized_css = [normalize_html(sheet) for sheet in css or []]
+    payload = json.dumps({
+        "html": normalize_html(html),
+        "css": normalized_css,
+        "resources": resource_digests(html + "\n".join(normalized_css)),
+        "base_url": base_url,
+        "options": options,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class RenderCache:
+    """Size-bounded on-disk cache of rendered PDF bytes, evicting least recently used renders."""
+
+    def __init__(self, cache_dir: str = RENDER_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def get(self, key: str) -> bytes:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as pdf_file:
+                pdf = pdf_file.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        now = time.time()
+        os.utime(path, (now, now))
+        self.hits += 1
+        return pdf
+
+    def put(self, key: str, pdf: bytes):
+        path = self._path(key)
+        try:
+            cache_files.write_atomic(path, pdf)
+            with self._lock:
+                self._evict()
+        except OSError as e:
+            logging.error(f"Error caching render {key}: {e}")
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".pdf"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> RenderCache:
+    """Return the shared render cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RenderCache()
+    return _cache
\ No newline at end of file
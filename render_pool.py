@@ -0,0 +1,340 @@
+import os
+import time
+import queue
+import atexit
+import signal
+import logging
+import threading
+import multiprocessing
+import itertools
+from concurrent.futures import Future
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+import simplify
+import cost_model
+
+DEFAULT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+DEFAULT_MAX_JOBS_PER_WORKER = 50
+DEFAULT_TIMEOUT = 120
+DEFAULT_MEMORY_LIMIT = int(os.getenv("RENDER_MEMORY_MB", 1536)) * 1024 * 1024
+MEMORY_POLL_INTERVAL = 0.25
+# Heavy workers get this many times the memory limit and timeout of standard ones
+HEAVY_FACTOR = 2
+
+WARM_UP_HTML = "<html><body style=\"font-family: sans-serif\"><p>warm up</p></body></html>"
+
+class RenderFailed(RuntimeError):
+    """
+    A render that did not produce a PDF. status is "render_timeout", "render_oom" or
+    "render_error".
+    """
+
+    def __init__(self, status: str, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+    def as_dict(self) -> dict:
+        return {"status": self.status, "error": self.message}
+
+def _rss_bytes(pid: int) -> int:
+    """Resident set size of a process, or 0 where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+def _worker_main(conn, memory_limit: int = None):
+    """
+    Render loop run in each worker process. WeasyPrint is imported and a tiny page is
+    rendered once up front so fontconfig and the layout engine are warm for real jobs;
+    job stylesheets are parsed once per worker through the stylesheet registry, and
+    repeated jobs are answered from the render cache.
+
+    The parent enforces memory_limit on resident memory; the worker's address space is
+    capped at twice that as a backstop, so runaway allocations fail with MemoryError.
+    """
+    if resource is not None and memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit * 2, memory_limit * 2))
+    from weasyprint import HTML
+    import stylesheets
+    import render
+    import render_cache
+
+    font_config = stylesheets.get_font_config()
+    HTML(string=WARM_UP_HTML).write_pdf(font_config=font_config)
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        try:
+            hits = render_cache.get_cache().hits
+            pdf = render.write_pdf(job["html"], css=job.get("css"), base_url=job.get("base_url"),
+                                   **job.get("options", {}))
+            conn.send(("ok", pdf, render_cache.get_cache().hits > hits))
+        except MemoryError as e:
+            conn.send(("render_oom", f"MemoryError: {e}"))
+        except Exception as e:
+            conn.send(("render_error", f"{type(e).__name__}: {e}"))
+
+class _Worker:
+    def __init__(self, context, worker_class: str = "standard", memory_limit: int = None):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_limit), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.worker_class = worker_class
+        self.memory_limit = memory_limit
+        self.jobs = 0
+        self.peak_rss = 0
+        self.ready = False
+
+    def wait_ready(self, timeout: float) -> bool:
+        if not self.ready:
+            try:
+                if self.conn.poll(timeout):
+                    self.ready = self.conn.recv()[0] == "ready"
+            except (EOFError, OSError):
+                # The worker died while starting up (for example an ImportError); reap it for its exit code
+                self.process.join(1)
+                self.ready = False
+        return self.ready
+
+    def wait_result(self, timeout: float) -> str:
+        """
+        Wait for the current job, watching (and recording the peak of) the worker's resident
+        memory. Returns "ok" once a result is ready, or "render_timeout" / "render_oom" if a
+        limit was hit first.
+        """
+        deadline = time.monotonic() + timeout
+        self.peak_rss = _rss_bytes(self.process.pid)
+        while not self.conn.poll(min(MEMORY_POLL_INTERVAL, max(0, deadline - time.monotonic()))):
+            self.peak_rss = max(self.peak_rss, _rss_bytes(self.process.pid))
+            if self.memory_limit and self.peak_rss > self.memory_limit:
+                return "render_oom"
+            if time.monotonic() >= deadline:
+                return "render_timeout"
+        return "ok"
+
+    def death_status(self) -> str:
+        """
+        Why a worker whose pipe closed went away: "render_oom" only if it was killed with
+        SIGKILL, as the kernel's OOM killer does, otherwise "render_error".
+        """
+        self.process.join(1)
+        if self.process.exitcode == -getattr(signal, "SIGKILL", 9):
+            return "render_oom"
+        return "render_error"
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+class RenderPool:
+    """
+    Pool of WeasyPrint worker processes, started up front, that stay warm between renders.
+
+    A job is HTML plus CSS strings and write_pdf options; the result is PDF bytes. A job
+    that runs past its timeout or above its memory limit has its worker killed and
+    replaced, and fails with a RenderFailed whose status says which limit it hit; by
+    default it is then retried once in simplified form. Each worker is recycled after
+    max_jobs_per_worker jobs to bound memory growth.
+
+    Submitted jobs are scheduled shortest-job-first on the render time predicted by the
+    cost model, and jobs predicted to be expensive go to the heavy workers, which get
+    HEAVY_FACTOR times the memory limit and timeout. Every render is recorded as telemetry
+    for training the model.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_jobs_per_worker: int = DEFAULT_MAX_JOBS_PER_WORKER,
+                 timeout: float = DEFAULT_TIMEOUT, memory_limit: int = DEFAULT_MEMORY_LIMIT,
+                 heavy_workers: int = None):
+        # Never fork: dispatcher threads (and threads holding cache or session locks) already exist,
+        # and a forked child could inherit a lock mid-acquire. Workers import what they need themselves.
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._context = multiprocessing.get_context(method)
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.model = cost_model.get_model()
+        if heavy_workers is None:
+            heavy_workers = 1 if workers > 1 else 0
+        self._sizes = {"standard": workers - heavy_workers, "heavy": heavy_workers}
+        self._idle = {worker_class: queue.Queue() for worker_class in self._sizes}
+        self._jobs = {worker_class: queue.PriorityQueue() for worker_class in self._sizes}
+        self._sequence = itertools.count()
+        self._closed = False
+        self._dispatchers = []
+        for worker_class, size in self._sizes.items():
+            for _ in range(size):
+                self._idle[worker_class].put(self._new_worker(worker_class))
+                dispatcher = threading.Thread(target=self._dispatch, args=(worker_class,), daemon=True)
+                dispatcher.start()
+                self._dispatchers.append(dispatcher)
+
+    def _new_worker(self, worker_class: str) -> _Worker:
+        factor = HEAVY_FACTOR if worker_class == "heavy" else 1
+        return _Worker(self._context, worker_class, self.memory_limit * factor if self.memory_limit else None)
+
+    def _replace(self, worker: _Worker, kill: bool = False) -> _Worker:
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+        return self._new_worker(worker.worker_class)
+
+    def classify(self, html: str) -> tuple:
+        """Predict a job's cost and pick its worker class. Returns (features, prediction, worker_class)."""
+        features = cost_model.html_features(html)
+        prediction = self.model.predict(features)
+        heavy = (prediction["memory_mb"] * 1024 * 1024 > (self.memory_limit or float("inf")) / 2
+                 or prediction["seconds"] > self.timeout / 2)
+        worker_class = "heavy" if heavy and self._sizes["heavy"] else "standard"
+        if not self._sizes[worker_class]:
+            worker_class = "heavy"
+        return features, prediction, worker_class
+
+    def render(self, html: str, css: list = None, base_url: str = None, timeout: float = None,
+               fallback: bool = True, **options) -> bytes:
+        """
+        Render HTML to PDF bytes on a pooled worker, blocking until done. If the render
+        times out or runs out of memory and fallback is set, the simplified poster
+        (simplify.simplify_html) is rendered instead.
+        """
+        if self._closed:
+            raise RuntimeError("Render pool is closed.")
+        features, _, worker_class = self.classify(html)
+        return self._render(html, css, base_url, timeout, fallback, features, worker_class, options)
+
+    def _render(self, html: str, css: list, base_url: str, timeout: float, fallback: bool, features: dict,
+                worker_class: str, options: dict) -> bytes:
+        try:
+            return self._render_once(html, css, base_url, timeout, features, worker_class, options)
+        except RenderFailed as e:
+            if not fallback or e.status == "render_error":
+                raise
+            logging.warning(f"{e.status}: retrying with a simplified render")
+            return self._render_once(simplify.simplify_html(html), css, base_url, timeout, features,
+                                     worker_class, options)
+
+    def _render_once(self, html: str, css: list, base_url: str, timeout: float, features: dict,
+                     worker_class: str, options: dict) -> bytes:
+        timeout = timeout or self.timeout * (HEAVY_FACTOR if worker_class == "heavy" else 1)
+        worker = self._idle[worker_class].get()
+        started = time.monotonic()
+        status = "render_error"
+        cached = False
+        # Read off the worker before it can be replaced, so telemetry measures this job's worker
+        peak_rss = 0
+        try:
+            if not worker.wait_ready(timeout):
+                # Nothing about this job is at fault, so it is an error (no simplified retry)
+                exitcode = worker.process.exitcode
+                worker = self._replace(worker, kill=True)
+                message = ("Render worker did not start in time." if exitcode is None
+                           else f"Render worker exited during startup with code {exitcode}.")
+                logging.error(message)
+                raise RenderFailed("render_error", message)
+
+            started = time.monotonic()
+            worker.conn.send({"html": html, "css": css or [], "base_url": base_url, "options": options})
+            status = worker.wait_result(timeout)
+            peak_rss = worker.peak_rss
+            if status != "ok":
+                pid = worker.process.pid
+                worker = self._replace(worker, kill=True)
+                message = (f"Render exceeded {timeout}s" if status == "render_timeout"
+                           else f"Render exceeded {worker.memory_limit // (1024 * 1024)} MB")
+                logging.error(f"{status}: {message}, restarted worker {pid}")
+                raise RenderFailed(status, message)
+
+            status, payload, *details = worker.conn.recv()
+            cached = bool(details and details[0])
+            worker.jobs += 1
+            if worker.jobs >= self.max_jobs_per_worker or status == "render_oom":
+                worker = self._replace(worker, kill=status == "render_oom")
+            if status != "ok":
+                raise RenderFailed(status, payload)
+            return payload
+        except (EOFError, BrokenPipeError, ConnectionResetError) as e:
+            pid = worker.process.pid
+            status = worker.death_status()
+            message = f"Render worker died with exit code {worker.process.exitcode}"
+            logging.error(f"Render worker {pid} died ({status}): {e!r}")
+            worker = self._replace(worker, kill=True)
+            raise RenderFailed(status, message) from e
+        finally:
+            # Cache hits say nothing about how expensive a document is to render
+            if not (status == "ok" and cached):
+                cost_model.record(features, status, time.monotonic() - started, peak_rss / (1024 * 1024),
+                                  worker_class)
+            self._idle[worker_class].put(worker)
+
+    def submit(self, html: str, css: list = None, base_url: str = None, timeout: float = None,
+               fallback: bool = True, **options) -> Future:
+        """
+        Queue a render and return a concurrent.futures.Future resolving to PDF bytes.
+        Queued jobs run cheapest first by predicted render time.
+        """
+        if self._closed:
+            raise RuntimeError("Render pool is closed.")
+        features, prediction, worker_class = self.classify(html)
+        future = Future()
+        job = (html, css, base_url, timeout, fallback, features, worker_class, options)
+        self._jobs[worker_class].put((prediction["seconds"], next(self._sequence), future, job))
+        return future
+
+    def _dispatch(self, worker_class: str):
+        """Feed queued jobs of one worker class to its workers, shortest predicted first."""
+        while True:
+            _, _, future, job = self._jobs[worker_class].get()
+            if future is None:
+                break
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._render(*job))
+            except Exception as e:
+                future.set_exception(e)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for worker_class, size in self._sizes.items():
+            for _ in range(size):
+                # Sorts after every real job, so queued renders still finish
+                self._jobs[worker_class].put((float("inf"), next(self._sequence), None, None))
+        for dispatcher in self._dispatchers:
+            dispatcher.join()
+        for idle in self._idle.values():
+            while not idle.empty():
+                idle.get().stop()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> RenderPool:
+    """Return the shared render pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = RenderPool()
+            atexit.register(_pool.close)
+    return _pool
\ No newline at end of file
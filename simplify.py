@@ -0,0 +1,255 @@
+import os
+import re
+import sys
+import time
+import logging
+from collections import Counter
+from html import escape, unescape
+import tinycss2
+import tinycss2.color3
+
+FAST_RENDER = os.getenv("FAST_RENDER", "0") == "1"
+PAGE_SIZE = (8.5, 11)  # inches, letter paper unless an @page rule says otherwise
+# WeasyPrint's user-agent @page margin, 75px, in inches
+DEFAULT_PAGE_MARGIN = 75 / 96
+PAGE_SIZES = {"letter": (8.5, 11), "legal": (8.5, 14), "a5": (5.83, 8.27), "a4": (8.27, 11.69), "a3": (11.69, 16.54)}
+INCHES_PER_UNIT = {"in": 1, "cm": 1 / 2.54, "mm": 1 / 25.4, "q": 1 / 101.6, "pt": 1 / 72, "pc": 1 / 6, "px": 1 / 96}
+# Which of the given values the top, right, bottom and left margins take, by number of values
+MARGIN_SIDES = {1: (0, 0, 0, 0), 2: (0, 1, 0, 1), 3: (0, 1, 2, 1), 4: (0, 1, 2, 3)}
+
+SCRIPT_PATTERN = re.compile(r"<script\b[^>]*>.*?</script\s*>", re.IGNORECASE | re.DOTALL)
+STYLE_BLOCK_PATTERN = re.compile(r"(<style\b[^>]*>)(.*?)(</style\s*>)", re.IGNORECASE | re.DOTALL)
+STYLE_ATTRIBUTE_PATTERN = re.compile(r"""((?<![\w-])style\s*=\s*)(["'])(.*?)\2""", re.IGNORECASE | re.DOTALL)
+REMOTE_IMG_PATTERN = re.compile(r"""<img\b[^>]*\bsrc\s*=\s*["']https?://[^"']*["'][^>]*>""", re.IGNORECASE)
+HEAD_END_PATTERN = re.compile(r"</head\s*>", re.IGNORECASE)
+
+# Properties that are slow to draw in WeasyPrint or do nothing on paper
+DROPPED_PROPERTIES = {
+    "box-shadow", "text-shadow", "filter", "backdrop-filter", "transition", "animation", "will-change",
+    "border-radius", "border-top-left-radius", "border-top-right-radius",
+    "border-bottom-left-radius", "border-bottom-right-radius",
+}
+DROPPED_AT_RULES = {"keyframes", "-webkit-keyframes"}
+BACKGROUND_PROPERTIES = {"background", "background-image"}
+VIEWPORT_UNITS = {"vw", "vh", "vmin", "vmax"}
+
+# Overrides for the effects that make layout and drawing expensive, for CSS we cannot rewrite
+SIMPLIFIED_CSS = """
+* { box-shadow: none !important; text-shadow: none !important; filter: none !important;
+    background-image: none !important; }
+"""
+
+def strip_scripts(html: str) -> str:
+    """Drop <script> elements. WeasyPrint never runs them, so in-page scalers do nothing."""
+    return SCRIPT_PATTERN.sub("", html)
+
+def _inches(token) -> float:
+    if token.type == "number" and token.value == 0:
+        return 0.0
+    if token.type == "dimension" and token.lower_unit in INCHES_PER_UNIT:
+        return token.value * INCHES_PER_UNIT[token.lower_unit]
+    return None
+
+def _page_size(values: list, size: tuple) -> tuple:
+    lengths = [_inches(token) for token in values if token.type in ("dimension", "number")]
+    keywords = [token.lower_value for token in values if token.type == "ident"]
+    if lengths and None not in lengths:
+        size = (lengths[0], lengths[-1])
+    for keyword in keywords:
+        size = PAGE_SIZES.get(keyword, size)
+    if "landscape" in keywords:
+        size = (max(size), min(size))
+    elif "portrait" in keywords:
+        size = (min(size), max(size))
+    return size
+
+def page_area(css: str, page_size: tuple = PAGE_SIZE) -> tuple:
+    """
+    Width and height in inches of the page area inside the margins, as set by the @page
+    rules of css. This is what WeasyPrint resolves vw and vh against, not the paper.
+    """
+    width, height = page_size
+    margins = [DEFAULT_PAGE_MARGIN] * 4  # top, right, bottom, left
+    sides = ["top", "right", "bottom", "left"]
+    for rule in tinycss2.parse_stylesheet(css, skip_comments=True, skip_whitespace=True):
+        # Only the rule for every page; :first, :left and named pages are exceptions
+        if rule.type != "at-rule" or rule.lower_at_keyword != "page" or rule.content is None \
+                or tinycss2.serialize(rule.prelude).strip():
+            continue
+        for declaration in tinycss2.parse_declaration_list(rule.content, skip_comments=True, skip_whitespace=True):
+            if declaration.type != "declaration":
+                continue
+            values = [token for token in declaration.value if token.type not in ("whitespace", "comment")]
+            name = declaration.lower_name
+            if name == "margin":
+                lengths = [_inches(token) for token in values]
+                if len(lengths) in MARGIN_SIDES and None not in lengths:
+                    margins = [lengths[i] for i in MARGIN_SIDES[len(lengths)]]
+            elif name.startswith("margin-") and name[len("margin-"):] in sides and len(values) == 1:
+                length = _inches(values[0])
+                if length is not None:
+                    margins[sides.index(name[len("margin-"):])] = length
+            elif name == "size":
+                width, height = _page_size(values, (width, height))
+    return max(width - margins[1] - margins[3], 0.01), max(height - margins[0] - margins[2], 0.01)
+
+def document_page_area(html: str, css: list = None) -> tuple:
+    """page_area for a poster from its <style> blocks plus any extra stylesheets."""
+    return page_area("\n".join([match.group(2) for match in STYLE_BLOCK_PATTERN.finditer(html)] + list(css or [])))
+
+def _viewport_inches(value: float, unit: str, area: tuple) -> float:
+    width, height = area
+    sizes = {"vw": width, "vh": height, "vmin": min(width, height), "vmax": max(width, height)}
+    return value * sizes[unit] / 100
+
+def _serialize(tokens: list, counts: Counter, area: tuple) -> str:
+    """Serialize component values, converting viewport units to inches on the way."""
+    parts = []
+    for token in tokens:
+        if token.type == "dimension" and token.lower_unit in VIEWPORT_UNITS:
+            parts.append(f"{_viewport_inches(token.value, token.lower_unit, area):.4g}in")
+            counts["viewport-units"] += 1
+        elif token.type == "function":
+            parts.append(f"{token.name}({_serialize(token.arguments, counts, area)})")
+        elif token.type in ("() block", "[] block", "{} block"):
+            opening = token.type[0]
+            closing = {"(": ")", "[": "]", "{": "}"}[opening]
+            parts.append(f"{opening}{_serialize(token.content, counts, area)}{closing}")
+        else:
+            parts.append(token.serialize())
+    return "".join(parts)
+
+def _gradient_color(tokens: list) -> str:
+    """The first color stop of the first gradient in a background value."""
+    for token in tokens:
+        if token.type == "function" and token.lower_name.endswith("gradient"):
+            for argument in token.arguments:
+                if argument.type in ("whitespace", "literal", "comment"):
+                    continue
+                color = tinycss2.color3.parse_color(argument)
+                if color is not None and color != "currentColor":
+                    return argument.serialize()
+    return None
+
+def _declarations(declarations: list, counts: Counter, area: tuple) -> list:
+    rewritten = []
+    for declaration in declarations:
+        if declaration.type != "declaration":
+            if declaration.type != "error":
+                rewritten.append(declaration.serialize())
+            continue
+        name = declaration.lower_name
+        if name in DROPPED_PROPERTIES or name.startswith("animation-") or name.startswith("transition-"):
+            counts[name] += 1
+            continue
+        important = " !important" if declaration.important else ""
+        if name in BACKGROUND_PROPERTIES:
+            color = _gradient_color(declaration.value)
+            if color is not None:
+                counts["gradient"] += 1
+                rewritten.append(f"background-color: {color}{important}")
+                continue
+        value = _serialize(declaration.value, counts, area).strip()
+        rewritten.append(f"{declaration.name}: {value}{important}")
+    return rewritten
+
+def fast_declarations(css: str, counts: Counter = None, area: tuple = None) -> str:
+    """Simplify a declaration list, such as the contents of a style attribute."""
+    counts = counts if counts is not None else Counter()
+    area = area or page_area("")
+    declarations = tinycss2.parse_declaration_list(css, skip_comments=True, skip_whitespace=True)
+    return "; ".join(_declarations(declarations, counts, area))
+
+def _rules(rules: list, counts: Counter, area: tuple) -> list:
+    rewritten = []
+    for rule in rules:
+        if rule.type == "qualified-rule":
+            declarations = tinycss2.parse_declaration_list(rule.content, skip_comments=True, skip_whitespace=True)
+            body = "; ".join(_declarations(declarations, counts, area))
+            rewritten.append(f"{tinycss2.serialize(rule.prelude).strip()} {{ {body} }}")
+        elif rule.type == "at-rule" and rule.lower_at_keyword in DROPPED_AT_RULES:
+            counts[f"@{rule.lower_at_keyword}"] += 1
+        elif rule.type == "at-rule" and rule.lower_at_keyword in ("media", "supports") and rule.content is not None:
+            inner = tinycss2.parse_rule_list(rule.content, skip_comments=True, skip_whitespace=True)
+            body = "\n".join(_rules(inner, counts, area))
+            rewritten.append(f"@{rule.at_keyword}{tinycss2.serialize(rule.prelude).rstrip()} {{\n{body}\n}}")
+        elif rule.type != "error":
+            rewritten.append(rule.serialize())
+    return rewritten
+
+def fast_css(css: str, area: tuple = None) -> tuple:
+    """
+    Rewrite a stylesheet for fast rendering: drop shadows, filters, rounded corners,
+    animations and keyframes, replace gradient backgrounds with their first color, and
+    convert vw/vh to inches of the page area (by default from css's own @page rules, see
+    page_area). Returns (css, counts of rewrites).
+    """
+    counts = Counter()
+    area = area or page_area(css)
+    rules = tinycss2.parse_stylesheet(css, skip_comments=True, skip_whitespace=True)
+    return "\n".join(_rules(rules, counts, area)), counts
+
+def fast_html(html: str, area: tuple = None) -> tuple:
+    """Strip scripts and run fast_css over every <style> block and style attribute."""
+    counts = Counter()
+    area = area or document_page_area(html)
+    script_count = len(SCRIPT_PATTERN.findall(html))
+    if script_count:
+        counts["script"] = script_count
+        html = strip_scripts(html)
+
+    def rewrite_block(match):
+        css, block_counts = fast_css(match.group(2), area)
+        counts.update(block_counts)
+        return f"{match.group(1)}\n{css}\n{match.group(3)}"
+
+    def rewrite_attribute(match):
+        css = escape(fast_declarations(unescape(match.group(3)), counts, area))
+        return f"{match.group(1)}{match.group(2)}{css}{match.group(2)}"
+
+    html = STYLE_BLOCK_PATTERN.sub(rewrite_block, html)
+    html = STYLE_ATTRIBUTE_PATTERN.sub(rewrite_attribute, html)
+    return html, counts
+
+def simplify_html(html: str) -> str:
+    """
+    Cheaper version of a poster for when the full render times out or runs out of memory:
+    fast_html rewriting, no remote images, and overrides for any effects left in CSS we
+    could not rewrite.
+    """
+    html, _ = fast_html(html)
+    html = REMOTE_IMG_PATTERN.sub("", html)
+    style = f"<style>{SIMPLIFIED_CSS}</style>"
+    if HEAD_END_PATTERN.search(html):
+        return HEAD_END_PATTERN.sub(lambda match: style + match.group(0), html, count=1)
+    return style + html
+
+def report_savings(html: str, css: list = None, **options) -> dict:
+    """Render a document as-is and with fast rendering, and report the time saved."""
+    import render
+
+    start = time.perf_counter()
+    render.write_pdf(html, css=css, use_cache=False, fast=False, **options)
+    original = time.perf_counter() - start
+    start = time.perf_counter()
+    render.write_pdf(html, css=css, use_cache=False, fast=True, **options)
+    fast = time.perf_counter() - start
+
+    _, counts = fast_html(html)
+    for sheet in css or []:
+        counts.update(fast_css(sheet)[1])
+    return {
+        "original_seconds": round(original, 3),
+        "fast_seconds": round(fast, 3),
+        "saved_seconds": round(original - fast, 3),
+        "saved_percent": round(100 * (original - fast) / original, 1) if original else 0.0,
+        "rewrites": dict(counts),
+    }
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    for path in sys.argv[1:]:
+        with open(path, "r", encoding="utf-8") as html_file:
+            report = report_savings(html_file.read())
+        logging.info(f"{path}: {report['original_seconds']}s -> {report['fast_seconds']}s "
+                     f"(saved {report['saved_percent']}%), rewrites {report['rewrites']}")
\ No newline at end of file
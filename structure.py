@@ -0,0 +1,35 @@
+def walk(box):
+    """Yield a laid-out box and all of its descendants, depth first."""
+    yield box
+    for child in getattr(box, "children", None) or []:
+        yield from walk(child)
+
+def box_json(box, scale: float = 1.0) -> dict:
+    """
+    Describe a laid-out box and its descendants: box type, source element, border-box
+    position and size in output pixels (CSS px times scale), and text for text boxes.
+    """
+    node = {
+        "type": type(box).__name__,
+        "tag": getattr(box, "element_tag", None),
+        "x": round(box.border_box_x() * scale, 2),
+        "y": round(box.border_box_y() * scale, 2),
+        "width": round(box.border_width() * scale, 2),
+        "height": round(box.border_height() * scale, 2),
+    }
+    if getattr(box, "text", None):
+        node["text"] = box.text
+    children = [box_json(child, scale) for child in getattr(box, "children", None) or []]
+    if children:
+        node["children"] = children
+    return node
+
+def document_structure(document, scale: float = 1.0) -> dict:
+    """Structural JSON of a laid-out WeasyPrint document: one box tree per page."""
+    return {
+        "pages": [{
+            "width": round(page.width * scale, 2),
+            "height": round(page.height * scale, 2),
+            "boxes": box_json(page._page_box, scale),
+        } for page in document.pages]
+    }
\ No newline at end of file
@@ -0,0 +1,43 @@
+import hashlib
+import threading
+from weasyprint import CSS
+try:
+    from weasyprint.text.fonts import FontConfiguration
+except ImportError:  # WeasyPrint < 53
+    from weasyprint.fonts import FontConfiguration
+import fonts
+import url_fetcher
+
+_font_config = None
+_stylesheets = {}
+_lock = threading.Lock()
+
+def get_font_config() -> FontConfiguration:
+    """
+    Return the process-wide FontConfiguration. Sharing it means @font-face rules are
+    resolved once, and every stylesheet from this module must be rendered with it.
+    """
+    global _font_config
+    with _lock:
+        if _font_config is None:
+            _font_config = FontConfiguration()
+    return _font_config
+
+def stylesheet_key(css: str) -> str:
+    return hashlib.sha256(css.encode("utf-8")).hexdigest()
+
+def get_stylesheet(css: str) -> CSS:
+    """
+    Return a parsed stylesheet for a CSS string, parsing each distinct string only once.
+    Google Fonts imports are rewritten to the local font bundle before parsing, and
+    anything still remote is fetched through the caching url_fetcher.
+    """
+    key = stylesheet_key(css)
+    with _lock:
+        cached = _stylesheets.get(key)
+    if cached is not None:
+        return cached
+
+    sheet = CSS(string=fonts.localize_fonts(css), font_config=get_font_config(), url_fetcher=url_fetcher.get_fetcher())
+    with _lock:
+        return _stylesheets.setdefault(key, sheet)
\ No newline at end of file
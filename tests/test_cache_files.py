@@ -0,0 +1,31 @@
+import os
+import pytest
+import cache_files
+import unsplash
+
+def test_write_atomic_replaces_the_file_and_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "entry.bin"
+    cache_files.write_atomic(str(path), b"old")
+    cache_files.write_atomic(str(path), b"new")
+    assert path.read_bytes() == b"new"
+    assert os.listdir(tmp_path) == ["entry.bin"]
+
+def test_temp_files_are_unique(tmp_path):
+    with cache_files.temp_file(str(tmp_path / "entry.bin")) as first, \
+            cache_files.temp_file(str(tmp_path / "entry.bin")) as second:
+        assert first.name != second.name
+
+def test_failed_write_removes_its_temp_file(tmp_path):
+    with pytest.raises(TypeError):
+        cache_files.write_atomic(str(tmp_path / "entry.bin"), "not bytes")
+    assert os.listdir(tmp_path) == []
+
+def test_search_caches_sharing_a_file_keep_each_others_entries(tmp_path):
+    path = str(tmp_path / "search.json")
+    first, second = unsplash.SearchCache(path), unsplash.SearchCache(path)
+    first.put("baking", 1, None, [{"id": "a"}])
+    second.put("chess", 1, None, [{"id": "b"}])
+
+    cache = unsplash.SearchCache(path)
+    assert cache.get("baking", 1) == [{"id": "a"}]
+    assert cache.get("chess", 1) == [{"id": "b"}]
\ No newline at end of file
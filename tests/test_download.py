@@ -0,0 +1,48 @@
+import pytest
+import download
+import unsplash
+
+class Response:
+    def __init__(self, status_code: int, body: bytes):
+        self.status_code = status_code
+        self.headers = {"Content-Length": str(len(body))}
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+class Session:
+    def __init__(self, response: Response):
+        self.response = response
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(headers)
+        return self.response
+
+def test_resumed_download_over_the_cap_discards_the_part_file(tmp_path, monkeypatch):
+    dest = tmp_path / "photo.jpg"
+    part = tmp_path / "photo.jpg.part"
+    part.write_bytes(b"x" * 60)
+    session = Session(Response(206, b"y" * 60))
+    monkeypatch.setattr(unsplash, "get_session", lambda: session)
+
+    with pytest.raises(ValueError):
+        download.download_to_file("https://example.com/photo.jpg", str(dest), max_bytes=100)
+    assert session.requests == [{"Range": "bytes=60-"}]
+    assert not part.exists()
+
+    # The next attempt starts over instead of resuming past the cap
+    session.response = Response(200, b"z" * 80)
+    download.download_to_file("https://example.com/photo.jpg", str(dest), max_bytes=100)
+    assert session.requests[-1] == {}
+    assert dest.read_bytes() == b"z" * 80
\ No newline at end of file
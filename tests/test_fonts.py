@@ -0,0 +1,29 @@
+import logging
+import fonts
+
+IMPORT = "@import url('https://fonts.googleapis.com/css2?family=Roboto:wght@400;700&family=Montserrat:wght@400;700&display=swap');"
+
+def install(font_dir, *names):
+    for name in names:
+        (font_dir / name).write_bytes(b"")
+
+def test_missing_bundle_keeps_imports_and_warns_once(tmp_path, caplog):
+    with caplog.at_level(logging.WARNING):
+        for _ in range(3):
+            assert fonts.localize_fonts(IMPORT, str(tmp_path)) == IMPORT
+    assert len([record for record in caplog.records if "No font bundle" in record.getMessage()]) == 1
+
+def test_fully_bundled_import_becomes_local_rules(tmp_path):
+    install(tmp_path, "Roboto-400-normal.ttf", "Roboto-700-normal.ttf", "Montserrat-400-normal.ttf")
+    css = fonts.localize_fonts(IMPORT, str(tmp_path))
+    assert "googleapis" not in css
+    assert css.count("@font-face") == 3
+
+def test_partly_bundled_import_is_kept(tmp_path):
+    install(tmp_path, "Roboto-400-normal.ttf")
+    assert fonts.localize_fonts(IMPORT, str(tmp_path)) == IMPORT
+
+def test_local_fonts_can_be_turned_off(tmp_path, monkeypatch):
+    install(tmp_path, "Roboto-400-normal.ttf", "Montserrat-400-normal.ttf")
+    monkeypatch.setattr(fonts, "LOCAL_FONTS", False)
+    assert fonts.localize_fonts(IMPORT, str(tmp_path)) == IMPORT
\ No newline at end of file
@@ -0,0 +1,30 @@
+import io
+from PIL import Image
+import image_cache
+
+def jpeg(color) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(output, "JPEG")
+    return output.getvalue()
+
+def test_stores_sharing_a_directory_keep_each_others_entries(tmp_path):
+    # Two render workers each open their own ImageStore on the same directory
+    first = image_cache.ImageStore(str(tmp_path))
+    second = image_cache.ImageStore(str(tmp_path))
+    red = first.add(jpeg("red"), "https://example.com/red.jpg", "red", keyword="fire")
+    blue = second.add(jpeg("blue"), "https://example.com/blue.jpg", "blue", keyword="ocean")
+    first.remember_keyword("flame", red)
+
+    store = image_cache.ImageStore(str(tmp_path))
+    assert store.lookup_keyword("fire")["key"] == red["key"]
+    assert store.lookup_keyword("flame")["key"] == red["key"]
+    assert store.lookup_keyword("ocean")["key"] == blue["key"]
+
+def test_images_evicted_elsewhere_are_not_restored(tmp_path):
+    first = image_cache.ImageStore(str(tmp_path))
+    second = image_cache.ImageStore(str(tmp_path), max_bytes=0)
+    old = first.add(jpeg("red"), "https://example.com/red.jpg", "red")
+    second.add(jpeg("blue"), "https://example.com/blue.jpg", "blue")
+    first.remember_keyword("fire", old)
+
+    assert image_cache.ImageStore(str(tmp_path)).lookup("red", old["url"]) is None
\ No newline at end of file
@@ -0,0 +1,13 @@
+import latex_backend
+
+def document(body: str) -> str:
+    return "\\documentclass{article}\n\\usepackage{hyperref}\n\\begin{document}\n" + body + "\n\\end{document}"
+
+def test_urls_may_contain_hash_ampersand_and_percent():
+    tex = document("Sign up at \\href{https://example.com/join?a=1&b=2#form}{our page}\n"
+                   "or \\url{https://example.com/a%20b#top}.")
+    assert latex_backend.validate_latex(tex) == []
+
+def test_link_text_is_still_checked():
+    tex = document("See \\href{https://example.com/#faq}{Q&A}.")
+    assert latex_backend.validate_latex(tex) == ["poster.tex:4: unescaped & outside a table (write \\& for an ampersand)"]
\ No newline at end of file
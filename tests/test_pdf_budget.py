@@ -0,0 +1,52 @@
+import io
+import pytest
+from PIL import Image
+import pdf_budget
+try:
+    import render
+except (ImportError, OSError):  # OSError when WeasyPrint's native libraries are missing
+    render = None
+
+class LaidOutDocument:
+    """A laid-out document whose PDF, like WeasyPrint's, ignores image options at write time."""
+
+    def __init__(self, pdf: bytes):
+        self.pdf = pdf
+
+    def write_pdf(self, zoom=1, **options) -> bytes:
+        return self.pdf
+
+def photo(size=(2400, 3000)) -> Image.Image:
+    return Image.effect_noise(size, 64).convert("RGB")
+
+def photo_pdf() -> bytes:
+    output = io.BytesIO()
+    photo().save(output, "PDF", resolution=300, quality=95)
+    return output.getvalue()
+
+def test_over_budget_pdf_gets_smaller():
+    pikepdf = pytest.importorskip("pikepdf")
+    pdf = photo_pdf()
+    budget = len(pdf) // 4
+    shrunk = pdf_budget.write_within_budget(LaidOutDocument(pdf), max_bytes=budget)
+    assert len(shrunk) <= budget
+    with pikepdf.open(io.BytesIO(shrunk)) as document:
+        assert len(document.pages) == 1
+        assert len(document.pages[0].get_images()) == 1
+
+def test_within_budget_pdf_keeps_its_images():
+    pytest.importorskip("pikepdf")
+    pdf = photo_pdf()
+    kept = pdf_budget.write_within_budget(LaidOutDocument(pdf), max_bytes=len(pdf) * 2)
+    assert abs(len(kept) - len(pdf)) < len(pdf) // 10
+
+@pytest.mark.skipif(render is None, reason="WeasyPrint is not available")
+def test_rerender_shrinks_without_pikepdf(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pdf_budget, "pikepdf", None)
+    photo().save("photo.jpg", quality=95)
+    html = '<img src="photo.jpg" style="width: 7in">'
+    full = render.write_pdf(html, base_url=str(tmp_path), use_cache=False, max_bytes=0)
+    budget = len(full) // 3
+    shrunk = render.write_pdf(html, base_url=str(tmp_path), use_cache=False, max_bytes=budget)
+    assert len(shrunk) <= budget < len(full)
\ No newline at end of file
@@ -0,0 +1,15 @@
+import pytest
+import simplify
+
+def test_viewport_units_resolve_against_page_area():
+    html, counts = simplify.fast_html("<style>@page { size: letter; margin: 0.5in } .poster { height: 100vh }</style>")
+    assert ".poster { height: 10in }" in html
+    assert counts["viewport-units"] == 1
+
+def test_default_page_margin_is_weasyprints():
+    assert simplify.page_area("") == pytest.approx((8.5 - 2 * 75 / 96, 11 - 2 * 75 / 96))
+
+def test_style_attribute_entities_survive():
+    html, _ = simplify.fast_html('<div style="font-family: &quot;Open Sans&quot;, serif; height: 10vh">x</div>',
+                                 area=(7.5, 10.0))
+    assert html == '<div style="font-family: &quot;Open Sans&quot;, serif; height: 1in">x</div>'
\ No newline at end of file
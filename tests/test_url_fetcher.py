@@ -0,0 +1,36 @@
+import base64
+import pytest
+import structure
+try:
+    from weasyprint import HTML
+except (ImportError, OSError):  # OSError when WeasyPrint's native libraries are missing
+    HTML = None
+
+pytestmark = pytest.mark.skipif(HTML is None, reason="WeasyPrint is not available")
+
+PNG = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAIAAAACCAIAAAD91JpzAAAAFklEQVR4nGP8z8DAwMDAxMDAwMDAAAANHQEDasKb6QAAAABJRU5ErkJggg==")
+REMOTE_URL = "https://images.example.com/poster.png"
+
+def test_html_renders_with_caching_fetcher(tmp_path, monkeypatch):
+    import url_fetcher
+
+    fetcher = url_fetcher.CachingURLFetcher(cache_dir=str(tmp_path))
+    fetched = []
+
+    def fetch(url, timeout):
+        fetched.append(url)
+        return {"body": PNG, "mime_type": "image/png", "encoding": None, "redirected_url": url}
+
+    monkeypatch.setattr(fetcher, "_fetch", fetch)
+    data_url = "data:image/png;base64," + base64.b64encode(PNG).decode()
+    html = f'<img src="{REMOTE_URL}" style="width: 1in"><img src="{data_url}" style="width: 1in">'
+
+    for _ in range(2):
+        document = HTML(string=html, url_fetcher=fetcher).render()
+        images = [box for box in structure.walk(document.pages[0]._page_box)
+                  if type(box).__name__ == "InlineReplacedBox"]
+        assert len(images) == 2
+        assert document.write_pdf().startswith(b"%PDF")
+
+    # The second render is served from the in-memory cache
+    assert fetched == [REMOTE_URL]
\ No newline at end of file
@@ -0,0 +1,248 @@
+import os
+import math
+import json
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import cache_files
+
+UNSPLASH_SEARCH_URL = "https://api.unsplash.com/search/photos"
+SEARCH_CACHE_PATH = os.path.join("cache", "unsplash_search.json")
+SEARCH_CACHE_TTL = 7 * 24 * 3600
+SEARCH_CACHE_NEGATIVE_TTL = 6 * 3600
+
+# Pixel widths of Unsplash's fixed-size variants, smallest first. "full" is the original size.
+UNSPLASH_VARIANT_WIDTHS = [("thumb", 200), ("small", 400), ("regular", 1080)]
+DEFAULT_PRINT_DPI = 150
+
+# Printed box (width, height) in inches for the image slots our letter-size posters use,
+# assuming the usual 0.5in page margins.
+IMAGE_SLOTS = {
+    "full_page": (7.5, 10.0),
+    "hero": (7.5, 4.0),
+    "half": (3.75, 3.0),
+    "inset": (3.0, 2.25),
+    "icon": (1.0, 1.0),
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session(pool_size: int = 10) -> requests.Session:
+    """
+    Return the shared keep-alive session used for Unsplash API and image requests.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+def _result_metadata(result: dict) -> dict:
+    """Keep the fields of an Unsplash search result that the poster pipeline uses."""
+    return {
+        "id": result.get("id"),
+        "urls": result.get("urls", {}),
+        "width": result.get("width"),
+        "height": result.get("height"),
+        "color": result.get("color"),
+        "likes": result.get("likes", 0),
+        "description": result.get("alt_description") or result.get("description") or "",
+    }
+
+def _ranked(keyword: str, keyword_index: int, results: list) -> list:
+    """Tag cached or fresh result metadata with its keyword and rank."""
+    return [dict(result, keyword=keyword, rank=(keyword_index, i)) for i, result in enumerate(results)]
+
+class SearchCache:
+    """
+    TTL cache of Unsplash search results keyed by (query, per_page, orientation).
+
+    Empty result lists are cached too, with a shorter TTL, so queries that find
+    nothing do not keep spending API rate limit. The cache is persisted as JSON.
+    """
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, ttl: float = SEARCH_CACHE_TTL,
+                 negative_ttl: float = SEARCH_CACHE_NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.error(f"Error reading Unsplash search cache, starting empty: {e}")
+            return {}
+
+    def _save(self):
+        """Merge with the cache on disk, which other processes may have added to, and write it back."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with cache_files.file_lock(self.path + ".lock"):
+            for key, entry in self._load().items():
+                if key not in self._entries or entry["stored"] > self._entries[key]["stored"]:
+                    self._entries[key] = entry
+            self._prune()
+            cache_files.write_atomic(self.path, json.dumps(self._entries).encode("utf-8"))
+
+    @staticmethod
+    def make_key(query: str, per_page: int, orientation: str) -> str:
+        return f"{query.strip().lower()}|{per_page}|{orientation or ''}"
+
+    def get(self, query: str, per_page: int, orientation: str = None) -> list:
+        """Return cached results, or None when the query is missing or expired."""
+        key = self.make_key(query, per_page, orientation)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            ttl = self.ttl if entry["results"] else self.negative_ttl
+            if time.time() - entry["stored"] > ttl:
+                del self._entries[key]
+                return None
+            return entry["results"]
+
+    def put(self, query: str, per_page: int, orientation: str, results: list):
+        key = self.make_key(query, per_page, orientation)
+        with self._lock:
+            self._entries[key] = {"stored": time.time(), "results": results}
+            self._save()
+
+    def _prune(self):
+        now = time.time()
+        for key, entry in list(self._entries.items()):
+            ttl = self.ttl if entry["results"] else self.negative_ttl
+            if now - entry["stored"] > ttl:
+                del self._entries[key]
+
+_search_cache = None
+
+def get_search_cache() -> SearchCache:
+    """Return the shared Unsplash search cache."""
+    global _search_cache
+    with _session_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache()
+    return _search_cache
+
+def _search_keyword(keyword: str, keyword_index: int, per_page: int, orientation: str, stop: threading.Event, timeout: float) -> list:
+    """Run a single Unsplash search query, unless the search was already satisfied."""
+    if stop.is_set():
+        return []
+
+    headers = {"Authorization": f"Client-ID {os.getenv('UNSPLASH_ACCESS_KEY')}"}
+    params = {"query": keyword, "per_page": per_page}
+    if orientation:
+        params["orientation"] = orientation
+
+    response = get_session().get(UNSPLASH_SEARCH_URL, headers=headers, params=params, timeout=timeout)
+    if response.status_code != 200:
+        logging.error(f"Unsplash API error for keyword '{keyword}': {response.status_code}")
+        return []
+
+    results = [_result_metadata(result) for result in response.json().get("results", [])]
+    get_search_cache().put(keyword, per_page, orientation, results)
+    return _ranked(keyword, keyword_index, results)
+
+def iter_search_results(keywords: list, per_page: int = 1, max_images: int = None, orientation: str = None,
+                        max_workers: int = 6, timeout: float = 10, use_cache: bool = True):
+    """
+    Query all keywords concurrently and yield result metadata in keyword order. Cached
+    queries are answered without touching the network; a keyword's results are yielded
+    as soon as it and every keyword ranked above it have answered. Once max_images
+    results have been yielded, queries that have not started yet are cancelled.
+    """
+    keywords = [keyword for keyword in keywords if keyword]
+    cache = get_search_cache() if use_cache else None
+    # Ranked results by keyword index, held until every higher-ranked keyword is done
+    ready = {}
+    misses = []
+    for i, keyword in enumerate(keywords):
+        cached = cache.get(keyword, per_page, orientation) if cache else None
+        if cached is None:
+            misses.append((i, keyword))
+        else:
+            ready[i] = _ranked(keyword, i, cached)
+
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(misses))) if misses else None
+    found = 0
+    try:
+        futures = {
+            executor.submit(_search_keyword, keyword, i, per_page, orientation, stop, timeout): (i, keyword)
+            for i, keyword in misses
+        }
+        completed = as_completed(futures)
+        for next_index in range(len(keywords)):
+            while next_index not in ready:
+                future = next(completed)
+                i, keyword = futures[future]
+                try:
+                    ready[i] = future.result()
+                except Exception as e:
+                    logging.error(f"Error searching Unsplash for keyword '{keyword}': {e}")
+                    ready[i] = []
+            for result in ready.pop(next_index):
+                yield result
+                found += 1
+                if max_images and found >= max_images:
+                    return
+    finally:
+        stop.set()
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def search_keywords(keywords: list, per_page: int = 1, max_images: int = None, orientation: str = None,
+                    max_workers: int = 6, timeout: float = 10, use_cache: bool = True) -> list:
+    """
+    Search Unsplash for all keywords concurrently and return the results ranked by keyword order,
+    then by Unsplash's own ordering within each keyword.
+    """
+    results = list(iter_search_results(keywords, per_page, max_images, orientation, max_workers, timeout, use_cache))
+    results.sort(key=lambda result: result["rank"])
+    return results
+
+def required_pixel_width(slot_width_in: float, slot_height_in: float = None, aspect_ratio: float = None,
+                         dpi: int = DEFAULT_PRINT_DPI) -> int:
+    """
+    Pixel width an image needs to fill a printed box at the given DPI. When the slot
+    height and image aspect ratio (width / height) are known, the image is assumed to
+    cover the box, so a wide image must be wide enough to fill the slot height too.
+    """
+    width_px = slot_width_in * dpi
+    if slot_height_in and aspect_ratio:
+        width_px = max(width_px, slot_height_in * dpi * aspect_ratio)
+    return math.ceil(width_px)
+
+def select_variant_url(result: dict, slot: str = "hero", dpi: int = DEFAULT_PRINT_DPI) -> str:
+    """
+    Pick the smallest Unsplash variant of a search result that prints sharply in an image slot.
+    Fixed-size variants are preferred; past "regular", the raw URL is resized with w= so we
+    never download the full original unless no raw URL is available.
+    """
+    urls = result.get("urls", {})
+    slot_width_in, slot_height_in = IMAGE_SLOTS[slot]
+    aspect_ratio = result["width"] / result["height"] if result.get("width") and result.get("height") else None
+    needed = required_pixel_width(slot_width_in, slot_height_in, aspect_ratio, dpi)
+    if result.get("width"):
+        needed = min(needed, result["width"])
+
+    for variant, width in UNSPLASH_VARIANT_WIDTHS:
+        if width >= needed and urls.get(variant):
+            return urls[variant]
+    if urls.get("raw"):
+        separator = "&" if "?" in urls["raw"] else "?"
+        return f"{urls['raw']}{separator}w={needed}&fit=max&fm=jpg&q=80"
+    return urls.get("full") or urls.get("regular")
\ No newline at end of file
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import unsplash
+import cache_files
+try:
+    from weasyprint.urls import URLFetcher, URLFetcherResponse
+except ImportError:  # WeasyPrint before URLFetcher classes takes a function returning a dict
+    from weasyprint import default_url_fetcher
+    URLFetcher = URLFetcherResponse = None
+
+URL_CACHE_DIR = os.path.join("cache", "urls")
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+DEFAULT_FETCH_TIMEOUT = 10
+
+class CachingURLFetcher(URLFetcher or object):
+    """
+    WeasyPrint url_fetcher that serves remote images, stylesheets and fonts from a shared
+    cache instead of refetching them on every render.
+
+    Responses are kept in an in-memory LRU and an on-disk LRU under URL_CACHE_DIR (shared
+    by render worker processes), both size-capped. Concurrent renders asking for the same
+    URL wait on a single in-flight fetch. data: and file: URLs go to WeasyPrint's default fetcher.
+
+    With WeasyPrint's URLFetcher class available this is a subclass overriding fetch();
+    on older versions it is called like the default_url_fetcher function.
+    """
+
+    def __init__(self, cache_dir: str = URL_CACHE_DIR, memory_bytes: int = DEFAULT_MEMORY_BYTES,
+                 disk_bytes: int = DEFAULT_DISK_BYTES, timeout: float = DEFAULT_FETCH_TIMEOUT, **kwargs):
+        if URLFetcher is not None:
+            super().__init__(timeout=timeout, **kwargs)
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.timeout = timeout
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def fetch(self, url: str, headers: dict = None):
+        """Return a URLFetcherResponse for url, from the cache when we have it."""
+        if not url.startswith(("http://", "https://")):
+            return super().fetch(url, headers)
+        entry = self._cached(url, self.timeout)
+        content_type = entry["mime_type"]
+        if entry["encoding"]:
+            content_type += f"; charset={entry['encoding']}"
+        return URLFetcherResponse(entry.get("redirected_url") or url, entry["body"], {"Content-Type": content_type})
+
+    if URLFetcher is None:
+        def __call__(self, url: str, timeout: float = None, ssl_context=None, **kwargs) -> dict:
+            if not url.startswith(("http://", "https://")):
+                return default_url_fetcher(url, timeout=timeout or self.timeout, ssl_context=ssl_context)
+            entry = self._cached(url, timeout or self.timeout)
+            return {
+                "string": entry["body"],
+                "mime_type": entry["mime_type"],
+                "encoding": entry["encoding"],
+                "redirected_url": entry.get("redirected_url") or url,
+            }
+
+    def _cached(self, url: str, timeout: float) -> dict:
+        while True:
+            with self._lock:
+                cached = self._memory_get(url)
+                if cached is not None:
+                    return cached
+                waiter = self._in_flight.get(url)
+                if waiter is None:
+                    waiter = self._in_flight[url] = threading.Event()
+                    break
+            # Someone else is fetching this URL; wait for them, then retry from the cache
+            waiter.wait(timeout)
+
+        try:
+            entry = self._disk_get(url) or self._fetch(url, timeout)
+            with self._lock:
+                self._memory_put(url, entry)
+            return entry
+        finally:
+            with self._lock:
+                self._in_flight.pop(url).set()
+
+    def _fetch(self, url: str, timeout: float) -> dict:
+        response = unsplash.get_session().get(url, timeout=timeout)
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "application/octet-stream")
+        mime_type, _, params = content_type.partition(";")
+        encoding = None
+        if "charset=" in params:
+            encoding = params.split("charset=", 1)[1].strip().strip('"')
+        entry = {
+            "body": response.content,
+            "mime_type": mime_type.strip(),
+            "encoding": encoding,
+            "redirected_url": response.url,
+        }
+        self._disk_put(url, entry)
+        return entry
+
+    def _memory_get(self, url: str) -> dict:
+        entry = self._memory.get(url)
+        if entry is not None:
+            self._memory.move_to_end(url)
+        return entry
+
+    def _memory_put(self, url: str, entry: dict):
+        if url in self._memory:
+            return
+        self._memory[url] = entry
+        self._memory_size += len(entry["body"])
+        while self._memory_size > self.memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted["body"])
+
+    def _disk_paths(self, url: str) -> tuple:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + ".bin", base + ".json"
+
+    def _disk_get(self, url: str) -> dict:
+        body_path, meta_path = self._disk_paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as meta_file:
+                entry = json.load(meta_file)
+            with open(body_path, 'rb') as body_file:
+                entry["body"] = body_file.read()
+        except (FileNotFoundError, ValueError):
+            return None
+        # Access time drives disk eviction
+        now = time.time()
+        os.utime(body_path, (now, now))
+        return entry
+
+    def _disk_put(self, url: str, entry: dict):
+        body_path, meta_path = self._disk_paths(url)
+        try:
+            cache_files.write_atomic(body_path, entry["body"])
+            cache_files.write_atomic(meta_path, json.dumps({k: v for k, v in entry.items() if k != "body"}).encode("utf-8"))
+            self._evict_disk()
+        except OSError as e:
+            logging.error(f"Error caching {url}: {e}")
+
+    def _evict_disk(self):
+        """Remove least recently used cached bodies until the cache fits in disk_bytes."""
+        bodies = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".bin"):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                bodies.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in bodies)
+        for _, size, path in sorted(bodies):
+            if total <= self.disk_bytes:
+                break
+            for stale in (path, path[:-len(".bin")] + ".json"):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+def get_fetcher() -> CachingURLFetcher:
+    """Return the shared caching url_fetcher."""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = CachingURLFetcher()
+    return _fetcher
\ No newline at end of file